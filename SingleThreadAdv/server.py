@@ -1,10 +1,18 @@
-import math
+import os
+import sys
 import socket
 import select
 import json
 from ratelimit import limits, sleep_and_retry
 import time
 
+# Shared solver modules live in the TSPServer folder
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'TSPServer'))
+from geometry import CityGeometry
+from space_filling import curve_sort
+from construction import farthest_insertion_tour
+from two_opt import two_opt_neighbors
+
 class QPRx2025:
     def __init__(self, seed=0):
         self.seed = seed % 1000000
@@ -114,85 +122,39 @@ processed_requests = {}
 REQUEST_LIMIT = 500
 TIME_PERIOD = 60 # 60 seconds
 CACHE_SIZE_LIMIT = 2000  # Define cache size limit
+NEIGHBOR_LIMIT = 8  # Candidate neighbours per city for the final 2-opt pass
 
 
-# Memoized dictionary to store distances for efficiency
-memoized_distances = {}
-
-# Higher-order function to memoize distances
-def memoize_distance(func):
-    def wrapper(city1, city2):
-        key = frozenset((city1['name'], city2['name']))
-        if key not in memoized_distances:
-            memoized_distances[key] = func(city1, city2)
-        return memoized_distances[key]
-    return wrapper
-
-@memoize_distance
-def calculate_distance(city1, city2):
-    return math.hypot(city1['x'] - city2['x'], city1['y'] - city2['y'])
-
-# Function to calculate total distance of the path
-def total_distance(path):
-    return sum(calculate_distance(path[i], path[(i + 1) % len(path)]) for i in range(len(path)))
-
-# Morton order function
-def morton_order(city):
-    def interleave_bits(x, y):
-        def spread_bits(v):
-            return (v | (v << 8)) & 0x00FF00FF | ((v | (v << 4)) & 0x0F0F0F0F) | ((v | (v << 2)) & 0x33333333) | ((v | (v << 1)) & 0x55555555)
-        return spread_bits(x) | (spread_bits(y) << 1)
-    x = int(city['x'] * 10000)  # Scale to avoid float precision issues
-    y = int(city['y'] * 10000)
-    return interleave_bits(x, y)
-
 def solve_tsp(cities):
-    """Optimize the path using the swap opt neighbor method."""
-
-    # Precompute and store distances between all pairs of cities
-    distances = {frozenset((city1['name'], city2['name'])): calculate_distance(city1, city2)
-                 for city1 in cities for city2 in cities if city1 != city2}
+    """Build the path by farthest insertion and polish it with neighbour-list 2-opt."""
 
     # Sort cities based on Morton order
-    cities_sorted = sorted(cities, key=morton_order)
+    cities_sorted = curve_sort(cities, 'morton')
 
-    # Measure time for the swap opt neighbor process
+    # Coordinates as float64 arrays; the path holds indices into cities_sorted
+    geometry = CityGeometry(cities_sorted)
+    distance = geometry.distance
+
+    # Measure time for construction and optimization
     start_time = time.time()
-    
-    # Swap opt neighbor heuristic and path initialization
-    unvisited = set(city['name'] for city in cities_sorted)
-    path = [cities_sorted[0]]
-    current_city = cities_sorted[0]
-
-    while unvisited:
-        unvisited.discard(current_city['name'])
-        closest = min((city for city in cities_sorted if city['name'] in unvisited), 
-                      key=lambda city: calculate_distance(current_city, city), 
-                      default=None)
-        if closest is None:
-            break
-
-        path.append(closest)
-        current_city = closest
-
-        # Perform local swaps to optimize the path during construction
-        for i in range(1, len(path) - 1):
-            for j in range(i + 1, len(path)):
-                if (calculate_distance(path[i - 1], path[i]) + calculate_distance(path[j], path[(j + 1) % len(path)])
-                    > calculate_distance(path[i - 1], path[j]) + calculate_distance(path[i], path[(j + 1) % len(path)])):
-                    path[i:j + 1] = reversed(path[i:j + 1])
+
+    # Farthest insertion replaces the old full swap sweep after every appended city,
+    # which cost O(n^2) per city; neighbour-list 2-opt then runs until no improving move remains
+    path = farthest_insertion_tour(geometry)
+    two_opt_neighbors(path, distance, geometry.nearest_neighbors(NEIGHBOR_LIMIT).tolist())
 
     # Ensure path returns to start to form a complete tour
     path.append(path[0])
-    total_dist = total_distance(path)
+    total_dist = geometry.tour_length(path)
     end_time = time.time()
     total_time = round((end_time - start_time) * 1000, 2)  # Convert to milliseconds and round to 2 decimal places
 
     # Construct optimized array with coordinates
-    optimized_array = [{'name': city['name'], 'x': city['x'], 'y': city['y']} for city in path]
+    optimized_array = [{'name': cities_sorted[idx]['name'], 'x': cities_sorted[idx]['x'], 'y': cities_sorted[idx]['y']}
+                       for idx in path]
 
     result = {
-        'optimized_path': [city['name'] for city in path],
+        'optimized_path': [geometry.names[idx] for idx in path],
         'optimized_distance': total_dist,
         'optimization_time': total_time,
         'optimized_array': optimized_array
@@ -1,10 +1,18 @@
-import math
+import os
+import sys
 import socket
 import select
 import json
 from ratelimit import limits, sleep_and_retry
 import time
 
+# Shared solver modules live in the TSPServer folder
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'TSPServer'))
+from geometry import CityGeometry
+from space_filling import curve_sort
+from construction import nearest_neighbor_tour
+from two_opt import two_opt_vectorized
+
 class QPRx2025:
     def __init__(self, seed=0):
         self.seed = seed % 1000000
@@ -115,117 +123,51 @@ REQUEST_LIMIT = 500
 TIME_PERIOD = 60 # 60 seconds
 CACHE_SIZE_LIMIT = 2000  # Define cache size limit
 
-# Memoized dictionary to store distances for efficiency
-memoized_distances = {}
-
-# Higher-order function to memoize distances
-def memoize_distance(func):
-    def wrapper(city1, city2):
-        key = frozenset((city1['name'], city2['name']))
-        if key not in memoized_distances:
-            memoized_distances[key] = func(city1, city2)
-        return memoized_distances[key]
-    return wrapper
-
-@memoize_distance
-def calculate_distance(city1, city2):
-    # Check if distance is already calculated and cached
-    if (city1['name'], city2['name']) not in memoized_distances:
-        # Calculate and cache the distance using Euclidean distance formula
-        memoized_distances[(city1['name'], city2['name'])] = math.hypot(city1['x'] - city2['x'], city1['y'] - city2['y'])
-    # Return the cached distance
-    return memoized_distances[(city1['name'], city2['name'])]
-
-def total_distance(path):
-    # Calculate the total distance of the given path
-    return sum([calculate_distance(path[i], path[(i + 1) % len(path)]) for i in range(len(path))])
-
-def morton_order(city):
-    # Function to compute Morton order (Z-order curve) for sorting cities
-    def interleave_bits(x, y):
-        # Spread bits to interleave x and y coordinates
-        def spread_bits(v):
-            v = (v | (v << 8)) & 0x00FF00FF
-            v = (v | (v << 4)) & 0x0F0F0F0F
-            v = (v | (v << 2)) & 0x33333333
-            v = (v | (v << 1)) & 0x55555555
-            return v
-        # Return interleaved bits of x and y
-        return spread_bits(x) | (spread_bits(y) << 1)
-    # Convert city coordinates to integers and scale them
-    x = int(city['x'] * 10000)
-    y = int(city['y'] * 10000)
-    # Return the Morton order of the city
-    return interleave_bits(x, y)
-
 def solve_tsp(cities):
     """Find and optimize a path using Morton order, nearest neighbor heuristic, and 2-opt algorithm."""
     
     # Sort cities based on Morton order for initial sorting
-    cities_sorted = sorted(cities, key=morton_order)
+    cities_sorted = curve_sort(cities, 'morton')
 
     # Check if there are any cities to process
     if not cities_sorted:
         print("No cities to process. Please check the input data.")
         return None
 
+    # Coordinates as float64 arrays; the path holds indices into cities_sorted
+    geometry = CityGeometry(cities_sorted)
+
     # Measure time for initial solution using nearest neighbor heuristic
     start_initial = time.time()
     
-    # Initialize unvisited cities set and path with the first city
-    unvisited = set(city['name'] for city in cities_sorted)
-    path = [cities_sorted[0]]
-    current_city = cities_sorted[0]
-
-    # Nearest neighbor heuristic to construct initial path
-    while unvisited:
-        # Remove the current city from unvisited set
-        unvisited.discard(current_city['name'])
-        # Find the closest unvisited city
-        closest = min((city for city in cities_sorted if city['name'] in unvisited), 
-                      key=lambda city: calculate_distance(current_city, city), 
-                      default=None)
-        if closest is None:
-            break
-        # Append the closest city to the path and update current city
-        path.append(closest)
-        current_city = closest
+    # Nearest neighbor heuristic to construct initial path from the first city
+    path = nearest_neighbor_tour(geometry)
 
     # Ensure the path returns to the starting city to form a complete tour
     path.append(path[0])
-    initial_distance = total_distance(path)
+    initial_distance = geometry.tour_length(path)
     end_initial = time.time()
     initial_time = round((end_initial - start_initial) * 1000, 2)  # Convert to milliseconds and round to 2 decimal places
 
     # Measure time for optimizing the path using 2-opt
     start_optimized = time.time()
     
-    # 2-opt optimization algorithm to improve the path
-    improved = True
-    while improved:
-        improved = False
-        for i in range(1, len(path) - 2):
-            for j in range(i + 1, len(path) - 1):
-                # Check if swapping improves the path
-                if calculate_distance(path[i - 1], path[i]) + calculate_distance(path[j], path[(j + 1) % len(path)]) > \
-                   calculate_distance(path[i - 1], path[j]) + calculate_distance(path[i], path[(j + 1) % len(path)]):
-                    # Perform the swap if it improves the path
-                    path[i:j + 1] = reversed(path[i:j + 1])
-                    improved = True
-            if improved:
-                break  # Break outer loop early if an improvement was found
-
-    optimized_distance = total_distance(path)
+    # 2-opt optimization algorithm to improve the open tour; all moves of a row are scored
+    # with NumPy, and the sweep restarts after the first row that improved
+    path.pop()
+    two_opt_vectorized(path, geometry.coords, restart=True)
+    path.append(path[0])
+
+    optimized_distance = geometry.tour_length(path)
     end_optimized = time.time()
     optimized_time = round((end_optimized - start_optimized) * 1000, 2)  # Convert to milliseconds and round to 2 decimal places
 
     # Validation checks to ensure the path includes all cities and returns to the origin
-    unique_cities = {city['name'] for city in path}
-    all_cities = {city['name'] for city in cities}
-    is_valid_path = unique_cities == all_cities and path[0] == path[-1]
+    is_valid_path = set(path) == set(range(geometry.num_cities)) and path[0] == path[-1]
 
     # Prepare the optimized path array for output
-    optimized_array = [{'name': city['name'], 'x': city['x'], 'y': city['y']} for city in path]
+    optimized_array = [{'name': cities_sorted[idx]['name'], 'x': cities_sorted[idx]['x'], 'y': cities_sorted[idx]['y']}
+                       for idx in path]
 
     if is_valid_path:
         print("Path validation successful: Each city is visited once, and path returns to origin.")
@@ -233,8 +175,8 @@ def solve_tsp(cities):
         print("Path validation failed: Path does not include all cities or does not return to the origin.")
 
     return {
-        'initial_path': [city['name'] for city in path],
-        'optimized_path': [city['name'] for city in path],
+        'initial_path': [geometry.names[idx] for idx in path],
+        'optimized_path': [geometry.names[idx] for idx in path],
         'initial_distance': initial_distance,
         'optimized_distance': optimized_distance,
         'initial_time': initial_time,
@@ -0,0 +1,152 @@
+import math
+import random
+import time
+from deadline import NO_DEADLINE
+from local_search import OR_OPT_SEGMENT, local_search, move_segment
+from tour import ArrayTour, tour_view
+from two_opt import IMPROVEMENT_EPSILON
+
+# Temperature schedules over the run: 'geometric' decays by a constant factor, 'linear' by a constant step
+COOLING_SCHEDULES = ('geometric', 'linear')
+
+# Proposed moves per city when no deadline bounds the run
+ANNEAL_MOVES_PER_CITY = 200
+# Moves between temperature updates, deadline checks and best-tour snapshots
+ANNEAL_BATCH = 500
+# Share of a deadline spent annealing; the rest is left for the final descent
+ANNEAL_TIME_SHARE = 0.9
+# Share of proposals that are 2-opt moves, the others are Or-opt moves
+TWO_OPT_SHARE = 0.5
+# The start temperature accepts the average uphill move with this probability
+START_ACCEPTANCE = 0.5
+# End temperature as a fraction of the start temperature
+END_TEMPERATURE_RATIO = 1e-3
+# Random proposals sampled to estimate the start temperature
+TEMPERATURE_SAMPLES = 1000
+
+def propose_two_opt(tour, distance, neighbors, rng):
+    """
+    Random 2-opt move that adds an edge from a random city to one of its neighbours.
+
+    :return: (length change, two_opt_move arguments), or None if the draw is degenerate.
+    """
+    city_a = rng.randrange(tour.num_cities)
+    city_c = rng.choice(neighbors[city_a])
+    step = tour.next if rng.random() < 0.5 else tour.prev
+    city_b, city_d = step(city_a), step(city_c)
+    if city_c == city_b or city_d == city_a:
+        return None
+    delta = distance(city_a, city_c) + distance(city_b, city_d) - distance(city_a, city_b) - distance(city_c, city_d)
+    return delta, (city_a, city_b, city_c, city_d)
+
+def propose_or_opt(tour, distance, neighbors, rng, max_segment=OR_OPT_SEGMENT):
+    """
+    Random Or-opt move of a segment of 1..max_segment cities next to a neighbour of one of its ends.
+
+    The cheaper of the two orientations is proposed.
+
+    :return: (length change, move_segment arguments), or None if the draw is degenerate.
+    """
+    first = last = rng.randrange(tour.num_cities)
+    segment = [first]
+    for _ in range(rng.randint(1, max_segment) - 1):
+        last = tour.next(last)
+        segment.append(last)
+    prev, after = tour.prev(first), tour.next(last)
+    c = rng.choice(neighbors[first if rng.random() < 0.5 else last])
+    d = tour.next(c)
+    if c in segment or d in segment:
+        return None
+    base = distance(prev, after) - distance(prev, first) - distance(last, after) - distance(c, d)
+    keep = base + distance(c, first) + distance(last, d)
+    flip = base + distance(c, last) + distance(first, d)
+    return min(keep, flip), (prev, first, last, after, c, d, flip < keep)
+
+def _propose(tour, distance, neighbors, rng):
+    if rng.random() < TWO_OPT_SHARE:
+        return propose_two_opt(tour, distance, neighbors, rng), tour.two_opt_move
+    return propose_or_opt(tour, distance, neighbors, rng), lambda *move: move_segment(tour, *move)
+
+def start_temperature(tour, distance, neighbors, rng, samples=TEMPERATURE_SAMPLES):
+    """Temperature at which the average sampled uphill move is accepted with probability START_ACCEPTANCE."""
+    uphill = []
+    for _ in range(samples):
+        proposal, _ = _propose(tour, distance, neighbors, rng)
+        if proposal is not None and proposal[0] > IMPROVEMENT_EPSILON:
+            uphill.append(proposal[0])
+    if not uphill:
+        return IMPROVEMENT_EPSILON
+    return -(sum(uphill) / len(uphill)) / math.log(START_ACCEPTANCE)
+
+def temperature_at(progress, start, end, cooling='geometric'):
+    """Temperature after the given fraction (0..1) of the run."""
+    if cooling == 'linear':
+        return start + (end - start) * progress
+    return start * (end / start) ** progress
+
+def simulated_annealing(tour, distance, neighbors, deadline=NO_DEADLINE, seed=0, cooling='geometric', moves=None,
+                        temperature=None):
+    """
+    Improve a cyclic tour in place by simulated annealing over neighbour-list 2-opt and Or-opt moves.
+
+    Every proposal is scored in O(1) from the edges it removes and adds; a
+    move that lengthens the tour by delta is still accepted with probability
+    exp(-delta / T). The temperature T falls from the start temperature to
+    END_TEMPERATURE_RATIO of it following the cooling schedule, over moves
+    proposals or, with a deadline, over ANNEAL_TIME_SHARE of the remaining
+    time, whichever ends first. The shortest tour seen is kept and finished
+    with a 2-opt + Or-opt descent.
+
+    :param seed: Seed of the move proposals and acceptance draws, for reproducible runs.
+    :param cooling: One of COOLING_SCHEDULES.
+    :param moves: Proposal budget; None allows ANNEAL_MOVES_PER_CITY per city.
+    :param temperature: Start temperature; None estimates it from sampled moves.
+    :return: True if the final descent converged, False if the deadline cut the run short.
+    """
+    if cooling not in COOLING_SCHEDULES:
+        raise ValueError(f"Unknown cooling schedule: {cooling}")
+    num_cities = len(tour)
+    if num_cities < 8:
+        return local_search(tour, distance, neighbors, ('2opt', 'or_opt'), deadline)
+
+    rng = random.Random(seed)
+    linked = ArrayTour(tour)
+    moves = ANNEAL_MOVES_PER_CITY * num_cities if moves is None else moves
+    if temperature is None:
+        temperature = start_temperature(linked, distance, neighbors, rng)
+    end_temperature = temperature * END_TEMPERATURE_RATIO
+    budget_ms = deadline.remaining_ms() * ANNEAL_TIME_SHARE
+    started = time.perf_counter()
+
+    current = best = sum(distance(tour[idx - 1], tour[idx]) for idx in range(num_cities))
+    best_tour = linked.view.copy()
+    proposed = 0
+    while proposed < moves:
+        progress = proposed / moves
+        if budget_ms == 0:
+            progress = 1.0
+        elif budget_ms != float('inf'):
+            progress = max(progress, (time.perf_counter() - started) * 1000 / budget_ms)
+        if progress >= 1 or deadline.expired():
+            break
+        current_temperature = temperature_at(progress, temperature, end_temperature, cooling)
+
+        batch = min(ANNEAL_BATCH, moves - proposed)
+        for _ in range(batch):
+            proposal, apply = _propose(linked, distance, neighbors, rng)
+            if proposal is None:
+                continue
+            delta, move = proposal
+            if delta < 0 or rng.random() < math.exp(-delta / current_temperature):
+                apply(*move)
+                current += delta
+        proposed += batch
+
+        if current < best - IMPROVEMENT_EPSILON:
+            best = current
+            best_tour[:] = linked.view
+
+    # Continue from the shortest snapshot and descend to its local optimum
+    if current > best:
+        tour_view(tour)[:] = best_tour
+    return local_search(tour, distance, neighbors, ('2opt', 'or_opt'), deadline)
@@ -0,0 +1,115 @@
+import time
+import numpy as np
+from deadline import NO_DEADLINE
+from two_opt import IMPROVEMENT_EPSILON
+
+# Largest instance size the batch path stacks; its work per move grows with n^2 per instance
+BATCH_MAX_CITIES = 30
+# Instances stacked per array; larger groups run slice by slice to bound the (B, n, n) working set
+BATCH_SLICE = 1000
+
+def batch_distances(coords):
+    """(B, n, n) distance matrices of B same-size instances given as a (B, n, 2) coordinate array."""
+    coords = np.asarray(coords, dtype=np.float64)
+    deltas = coords[:, :, None, :] - coords[:, None, :, :]
+    return np.hypot(deltas[..., 0], deltas[..., 1])
+
+def batch_tour_lengths(distances, tours):
+    """Closed tour length of every instance, for (B, n) tours of city indices."""
+    rows = np.arange(len(tours))[:, None]
+    return distances[rows, tours, np.roll(tours, -1, axis=1)].sum(axis=1)
+
+def batch_nearest_neighbor(distances, start=0):
+    """
+    Nearest-neighbour tours of all instances at once, each starting at city start.
+
+    One step extends every tour by the closest unvisited city of its
+    instance, so the interpreter runs n steps for the whole batch.
+
+    :return: (B, n) int32 array of city indices.
+    """
+    num_instances, num_cities = distances.shape[:2]
+    rows = np.arange(num_instances)
+    tours = np.empty((num_instances, num_cities), dtype=np.int32)
+    visited = np.zeros((num_instances, num_cities), dtype=bool)
+    current = np.full(num_instances, start, dtype=np.int64)
+    for step in range(num_cities):
+        tours[:, step] = current
+        visited[rows, current] = True
+        if step + 1 < num_cities:
+            current = np.where(visited, np.inf, distances[rows, current]).argmin(axis=1)
+    return tours
+
+def batch_two_opt(distances, tours, deadline=NO_DEADLINE):
+    """
+    Best-improvement 2-opt on all instances at once; tours is updated in place.
+
+    Every step reorders each distance matrix into tour order, scores the
+    reversal of every tour[i..j] (1 <= i < j) of every instance in one array
+    expression and applies each instance's best improving move with one
+    gather. Instances at a local optimum drop out of the next steps. The
+    first city keeps its position. The deadline is checked between steps.
+
+    :return: (B,) bool array, True where the instance reached a 2-opt local optimum.
+    """
+    num_instances, num_cities = tours.shape
+    converged = np.zeros(num_instances, dtype=bool)
+    if num_cities < 4:
+        converged[:] = True
+        return converged
+    positions = np.arange(num_cities)
+    # Valid (i, j) position pairs: 1 <= i < j <= n - 1
+    valid = np.triu(np.ones((num_cities, num_cities), dtype=bool), 1)
+    valid[0] = False
+    active = np.arange(num_instances)
+
+    while len(active) and not deadline.expired():
+        tour = tours[active]
+        rows = np.arange(len(active))[:, None, None]
+        # ordered[b, p, q] = distance between the cities at tour positions p and q
+        ordered = distances[active[:, None, None], tour[:, :, None], tour[:, None, :]]
+        # edge[b, p] = length of the edge from position p to p + 1 (wrapping)
+        edge = ordered[rows[:, :, 0], positions, (positions + 1) % num_cities]
+        # Reversing tour[i..j] swaps edges (i - 1, i) and (j, j + 1) for (i - 1, j) and (i, j + 1)
+        added = np.roll(ordered, 1, axis=1) + np.roll(ordered, -1, axis=2)
+        gains = added - np.roll(edge, 1, axis=1)[:, :, None] - edge[:, None, :]
+        gains = np.where(valid, gains, np.inf).reshape(len(active), -1)
+
+        best = gains.argmin(axis=1)
+        improving = gains[np.arange(len(active)), best] < -IMPROVEMENT_EPSILON
+        converged[active[~improving]] = True
+        active, best = active[improving], best[improving]
+        if not len(active):
+            break
+        i, j = (best // num_cities)[:, None], (best % num_cities)[:, None]
+        inside = (positions >= i) & (positions <= j)
+        order = np.where(inside, i + j - positions, positions)
+        tours[active] = np.take_along_axis(tours[active], order, axis=1)
+
+    return converged
+
+def solve_batch(coords, deadline=NO_DEADLINE):
+    """
+    Nearest-neighbour construction plus 2-opt for B same-size instances stacked as a (B, n, 2) array.
+
+    :return: Dict with (B, n) 'initial_tours' and 'tours', their (B,) lengths, the per-instance 'converged'
+             flags and the 'initial_time' / 'optimized_time' of the whole batch in milliseconds.
+    """
+    start_initial = time.time()
+    distances = batch_distances(coords)
+    initial_tours = batch_nearest_neighbor(distances)
+    initial_time = round((time.time() - start_initial) * 1000, 2)
+
+    start_optimized = time.time()
+    tours = initial_tours.copy()
+    converged = batch_two_opt(distances, tours, deadline)
+    optimized_time = round((time.time() - start_optimized) * 1000, 2)
+    return {
+        'initial_time': initial_time,
+        'optimized_time': optimized_time,
+        'initial_tours': initial_tours,
+        'tours': tours,
+        'initial_lengths': batch_tour_lengths(distances, initial_tours),
+        'lengths': batch_tour_lengths(distances, tours),
+        'converged': converged
+    }
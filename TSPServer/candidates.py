@@ -0,0 +1,44 @@
+import numpy as np
+from spatial_index import KDTree
+
+# Candidate lists the neighbour-list engines can run on: the k nearest cities, or quadrant neighbours
+CANDIDATE_SETS = ('nearest', 'quadrant')
+
+INF = float('inf')
+
+def quadrant_candidates(coords, k):
+    """
+    Return an (n, k) int32 table of quadrant neighbours, each row sorted by distance.
+
+    Every city takes the k // 4 closest cities in each of the four quadrants
+    around it and tops the list up with its nearest remaining cities. On the
+    rim of a cluster the k nearest cities all lie on the inside; the quadrant
+    picks add the closest cities in the other directions, i.e. the
+    inter-cluster edges a tour needs, without growing the lists.
+    """
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    num_cities = len(coords)
+    k = max(0, min(k, num_cities - 1))
+    table = np.empty((num_cities, k), dtype=np.int32)
+    if k == 0:
+        return table
+
+    tree = KDTree(coords)
+    xs, ys = tree.xs, tree.ys
+    per_quadrant = max(1, k // 4)
+    for city in range(num_cities):
+        x, y = xs[city], ys[city]
+        chosen = set()
+        # Half-open quadrants cover the plane once; cities on the axes go to the side of larger x or y
+        for box in ((x, y, INF, INF), (-INF, y, x, INF), (-INF, -INF, x, y), (x, -INF, INF, y)):
+            found = [idx for idx in tree.nearest_k(x, y, per_quadrant + 1, box) if idx != city]
+            chosen.update(found[:per_quadrant])
+        if len(chosen) < k:
+            for idx in tree.nearest_k(x, y, 2 * k + 1):
+                if idx != city:
+                    chosen.add(idx)
+                    if len(chosen) == k:
+                        break
+        row = sorted(chosen, key=lambda idx: (xs[idx] - x) ** 2 + (ys[idx] - y) ** 2)
+        table[city] = row[:k]
+    return table
@@ -0,0 +1,65 @@
+import numpy as np
+
+def condensed_size(num_cities):
+    """Number of city pairs i < j, i.e. entries of the condensed upper triangle."""
+    return num_cities * (num_cities - 1) // 2
+
+def row_starts(num_cities):
+    """Offsets such that pair (i, j), i < j, sits at row_starts[i] + j of the condensed array."""
+    return [i * (2 * num_cities - i - 3) // 2 - 1 for i in range(num_cities)]
+
+def condensed_distances(coords):
+    """Upper triangle of the distance matrix, row by row, as one float32 array of n * (n - 1) / 2 entries."""
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    num_cities = len(coords)
+    values = np.empty(condensed_size(num_cities), dtype=np.float32)
+    start = 0
+    for i in range(num_cities - 1):
+        rest = coords[i + 1:]
+        values[start:start + len(rest)] = np.hypot(rest[:, 0] - coords[i, 0], rest[:, 1] - coords[i, 1])
+        start += len(rest)
+    return values
+
+class CondensedMatrix:
+    """
+    Symmetric distance matrix kept as its condensed float32 upper triangle.
+
+    Every pair is stored once in 4 bytes instead of twice as boxed Python
+    floats in a list of lists, about 16x less memory, and a row of the
+    triangle is one contiguous run. Scalar lookups go through a memoryview,
+    which hands back plain Python floats.
+    """
+
+    def __init__(self, num_cities, values):
+        self.num_cities = num_cities
+        self.values = values
+        self.flat = memoryview(values)
+        self.row_start = row_starts(num_cities)
+        self.distance = self._lookup()
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes
+
+    def _lookup(self):
+        # A closure over the lookup tables skips the attribute loads of a method call in hot loops
+        flat, row_start = self.flat, self.row_start
+
+        def distance(a, b):
+            """Distance between two city indices."""
+            if a < b:
+                return flat[row_start[a] + b]
+            if a > b:
+                return flat[row_start[b] + a]
+            return 0.0
+        return distance
+
+    def row(self, a):
+        """Distances from city a to every city, as a float64 array."""
+        row = np.zeros(self.num_cities)
+        if a > 0:
+            # Column a of the rows above a: one entry per earlier row
+            row[:a] = self.values[np.asarray(self.row_start[:a]) + a]
+        start = self.row_start[a] + a + 1
+        row[a + 1:] = self.values[start:start + self.num_cities - a - 1]
+        return row
@@ -0,0 +1,264 @@
+import heapq
+import numpy as np
+from spatial_index import KDTree
+from space_filling import curve_order
+from tour import make_tour, rotate_tour, tour_from_indices
+
+# Start tours a request can select with its 'construction' field
+CONSTRUCTIONS = ('nearest_neighbor', 'morton', 'hilbert', 'cheapest_insertion', 'farthest_insertion', 'greedy_edge')
+
+# Neighbour-list size used to find insertion candidates
+INSERTION_NEIGHBORS = 10
+
+# Neighbour-list size that supplies the greedy-edge candidate edges
+GREEDY_NEIGHBORS = 10
+
+def nearest_neighbor_tour(geometry, start=0):
+    """
+    Build a tour of city indices by repeatedly moving to the closest unvisited city.
+
+    Visited cities are removed from a k-d tree, so each step is a tree query
+    rather than a scan over every city and the whole tour costs about O(n log n).
+    """
+    if geometry.num_cities == 0:
+        return make_tour()
+    tree = KDTree(geometry.coords)
+    tree.remove(start)
+    tour = make_tour([start])
+    current = start
+    for _ in range(geometry.num_cities - 1):
+        current = tree.nearest_to(current)
+        tree.remove(current)
+        tour.append(current)
+    return tour
+
+def curve_tour(geometry, curve='hilbert', start=0):
+    """
+    Visit the cities in space-filling-curve order, an O(n log n) tour for very large inputs.
+
+    Hilbert order has no long jumps between quadrants and is usually about 25%
+    longer than optimal; Morton order is cheaper to key but jumps more.
+    """
+    if geometry.num_cities == 0:
+        return make_tour()
+    return rotate_tour(tour_from_indices(curve_order(geometry.coords, curve)), start)
+
+def _linked_tour(succ, start):
+    """Walk a successor array from start into an array tour."""
+    tour = make_tour([start])
+    city = succ[start]
+    while city != start:
+        tour.append(city)
+        city = succ[city]
+    return tour
+
+def _best_edge_near(geometry, succ, pred, city, anchors):
+    """Cheapest tour edge (u, v) to insert city into, among the edges touching the anchor cities."""
+    distance = geometry.distance
+    best_cost, best_edge = float('inf'), None
+    for anchor in anchors:
+        for u, v in ((pred[anchor], anchor), (anchor, succ[anchor])):
+            cost = distance(u, city) + distance(city, v) - distance(u, v)
+            if cost < best_cost:
+                best_cost, best_edge = cost, (u, v)
+    return best_cost, best_edge
+
+def cheapest_insertion_tour(geometry, start=0, neighbors=INSERTION_NEIGHBORS):
+    """
+    Grow a tour by always making the cheapest insertion of an unplaced city into a tour edge.
+
+    Only cities on the k-nearest-neighbour lists of an edge's endpoints are
+    considered for that edge. Candidate insertions sit in a heap keyed by their
+    cost and are dropped lazily when their edge has been split or their city
+    placed, so the whole build costs about O(n k log n) instead of O(n^2).
+    """
+    n = geometry.num_cities
+    if n == 0:
+        return make_tour()
+    if n < 3:
+        return rotate_tour(make_tour(range(n)), start)
+    distance = geometry.distance
+    table = geometry.nearest_neighbors(neighbors).tolist()
+    placed_tree = KDTree(geometry.coords, empty=True)
+    succ = [-1] * n
+    pred = [-1] * n
+    inserted = [False] * n
+    heap = []
+
+    def push_candidates(u, v):
+        base = distance(u, v)
+        for end in (u, v):
+            for city in table[end]:
+                if not inserted[city]:
+                    heapq.heappush(heap, (distance(u, city) + distance(city, v) - base, city, u, v))
+
+    def place(city, u, v):
+        succ[u], pred[city], succ[city], pred[v] = city, u, v, city
+        inserted[city] = True
+        placed_tree.add(city)
+        push_candidates(u, city)
+        push_candidates(city, v)
+
+    # Start from the two-city cycle between start and its nearest neighbour
+    other = table[start][0]
+    succ[start], pred[start], succ[other], pred[other] = other, other, start, start
+    inserted[start] = inserted[other] = True
+    placed_tree.add(start)
+    placed_tree.add(other)
+    push_candidates(start, other)
+    push_candidates(other, start)
+
+    remaining = n - 2
+    while remaining:
+        if heap:
+            _, city, u, v = heapq.heappop(heap)
+            if inserted[city] or succ[u] != v:
+                continue
+        else:
+            # No placed city lists an unplaced one as a neighbour (separate clusters):
+            # attach any unplaced city next to its closest placed city
+            city = inserted.index(False)
+            anchors = placed_tree.nearest_k(geometry.xs[city], geometry.ys[city], neighbors)
+            u, v = _best_edge_near(geometry, succ, pred, city, anchors)[1]
+        place(city, u, v)
+        remaining -= 1
+
+    return _linked_tour(succ, start)
+
+def farthest_insertion_tour(geometry, start=0, neighbors=INSERTION_NEIGHBORS):
+    """
+    Grow a tour by inserting the unplaced city farthest from the tour, each at its cheapest nearby edge.
+
+    Farthest insertion lays out the overall shape first and fills in detail
+    later. Distances to the tour only shrink, so a max-heap with lazy
+    re-checking against a k-d tree of placed cities picks the next city, and
+    the insertion edge is chosen among the edges touching the city's k nearest
+    placed cities.
+    """
+    n = geometry.num_cities
+    if n == 0:
+        return make_tour()
+    if n < 3:
+        return rotate_tour(make_tour(range(n)), start)
+    distance = geometry.distance
+    xs, ys = geometry.xs, geometry.ys
+    placed_tree = KDTree(geometry.coords, empty=True)
+    succ = [-1] * n
+    pred = [-1] * n
+    inserted = [False] * n
+
+    # Start from the cycle between start and the city farthest from it
+    other = int(geometry.row_distances(start).argmax())
+    if other == start:
+        other = (start + 1) % n
+    succ[start], pred[start], succ[other], pred[other] = other, other, start, start
+    for city in (start, other):
+        inserted[city] = True
+        placed_tree.add(city)
+
+    # Max-heap of (-distance to tour, city); stored distances are upper bounds
+    to_tour = geometry.distances_from([start, other]).min(axis=0).tolist()
+    heap = [(-to_tour[city], city) for city in range(n) if not inserted[city]]
+    heapq.heapify(heap)
+
+    while heap:
+        _, city = heapq.heappop(heap)
+        current = distance(city, placed_tree.nearest_to(city))
+        if heap and current < -heap[0][0]:
+            # Stale bound: the tour has grown closer since it was pushed
+            heapq.heappush(heap, (-current, city))
+            continue
+
+        anchors = placed_tree.nearest_k(xs[city], ys[city], neighbors)
+        u, v = _best_edge_near(geometry, succ, pred, city, anchors)[1]
+        succ[u], pred[city], succ[city], pred[v] = city, u, v, city
+        inserted[city] = True
+        placed_tree.add(city)
+
+    return _linked_tour(succ, start)
+
+def greedy_edge_tour(geometry, start=0, neighbors=GREEDY_NEIGHBORS):
+    """
+    Build a tour from the shortest candidate edges that keep every city at degree two without closing a cycle early.
+
+    Candidate edges come from the k-nearest-neighbour lists and are sorted
+    once; a union-find over the growing fragments rejects edges that would
+    close a sub-tour. The path fragments left over are joined end to end,
+    each time jumping to the closest free end of another fragment, found with
+    a k-d tree of fragment ends. Greedy tours are typically 15-20% above
+    optimal against about 25% for nearest neighbour, and they lack its long
+    closing edges.
+    """
+    n = geometry.num_cities
+    if n == 0:
+        return make_tour()
+    if n < 3:
+        return rotate_tour(make_tour(range(n)), start)
+
+    # Unique candidate edges (a < b) in order of increasing length
+    table = geometry.nearest_neighbors(neighbors)
+    rows = np.repeat(np.arange(n, dtype=np.int64), table.shape[1])
+    cols = table.ravel().astype(np.int64)
+    keys = np.unique(np.minimum(rows, cols) * n + np.maximum(rows, cols))
+    ends_a, ends_b = keys // n, keys % n
+    lengths = np.hypot(*(geometry.coords[ends_a] - geometry.coords[ends_b]).T)
+    order = np.argsort(lengths, kind='stable')
+
+    links = [[] for _ in range(n)]
+    parent = list(range(n))
+
+    def find(city):
+        while parent[city] != city:
+            parent[city] = parent[parent[city]]
+            city = parent[city]
+        return city
+
+    accepted = 0
+    for a, b in zip(ends_a[order].tolist(), ends_b[order].tolist()):
+        if len(links[a]) == 2 or len(links[b]) == 2:
+            continue
+        root_a, root_b = find(a), find(b)
+        if root_a == root_b:
+            continue
+        parent[root_a] = root_b
+        links[a].append(b)
+        links[b].append(a)
+        accepted += 1
+        if accepted == n - 1:
+            break
+
+    # Join the path fragments (single cities included) nearest free end first
+    free_ends = KDTree(geometry.coords, empty=True)
+    for city in range(n):
+        if len(links[city]) < 2:
+            free_ends.add(city)
+
+    tour = make_tour()
+    end = free_ends.nearest_to(start)
+    while end != -1:
+        free_ends.remove(end)
+        previous = -1
+        while True:
+            tour.append(end)
+            following = [city for city in links[end] if city != previous]
+            if not following:
+                break
+            previous, end = end, following[0]
+        free_ends.remove(end)
+        end = free_ends.nearest_to(end)
+
+    return rotate_tour(tour, start)
+
+def construct_tour(geometry, construction='nearest_neighbor', start=0):
+    """Build the start tour selected by name, beginning at city index start."""
+    if construction == 'nearest_neighbor':
+        return nearest_neighbor_tour(geometry, start)
+    if construction in ('morton', 'hilbert'):
+        return curve_tour(geometry, construction, start)
+    if construction == 'cheapest_insertion':
+        return cheapest_insertion_tour(geometry, start)
+    if construction == 'farthest_insertion':
+        return farthest_insertion_tour(geometry, start)
+    if construction == 'greedy_edge':
+        return greedy_edge_tour(geometry, start)
+    raise ValueError(f"Unknown construction: {construction}")
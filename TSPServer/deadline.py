@@ -0,0 +1,35 @@
+import time
+
+class Deadline:
+    """Wall-clock budget that anytime optimizers poll between moves; None means no limit."""
+
+    def __init__(self, budget_ms=None):
+        self.budget_ms = budget_ms
+        self.expires_at = None if budget_ms is None else time.perf_counter() + budget_ms / 1000
+
+    def expired(self):
+        return self.expires_at is not None and time.perf_counter() >= self.expires_at
+
+    def remaining_ms(self):
+        if self.expires_at is None:
+            return float('inf')
+        return max(0.0, (self.expires_at - time.perf_counter()) * 1000)
+
+    def watch(self, tour):
+        """Engines announce the tour object they move cities on; a plain deadline does not need it."""
+
+    def wall_clock_expiry(self):
+        """Expiry as a time.time() timestamp, for handing the same deadline to another process."""
+        if self.expires_at is None:
+            return None
+        return time.time() + self.remaining_ms() / 1000
+
+    @classmethod
+    def from_wall_clock(cls, expiry):
+        """Rebuild a deadline from a wall_clock_expiry() timestamp."""
+        if expiry is None:
+            return cls()
+        return cls(max(0.0, (expiry - time.time()) * 1000))
+
+# Shared instance for callers that do not impose a budget
+NO_DEADLINE = Deadline()
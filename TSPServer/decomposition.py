@@ -0,0 +1,231 @@
+import math
+import time
+import numpy as np
+from construction import construct_tour
+from deadline import Deadline, NO_DEADLINE
+from geometry import CityGeometry
+from local_search import local_search
+from multi_start import run_in_pool
+from solver import improve_tour
+from space_filling import curve_order
+from spatial_index import KDTree, LazyNeighbors
+from tour import make_tour
+
+# Ways to split the cities into parts: equal runs of the Morton order, equal-count grid tiles or k-means clusters
+PARTITIONS = ('morton', 'grid', 'kmeans')
+
+# Target number of cities per part
+DEFAULT_PART_SIZE = 5000
+# Smallest part size accepted; a part needs four cities before any 2-opt move exists
+MIN_PART_SIZE = 4
+# Lloyd iterations of the k-means partition
+KMEANS_ITERATIONS = 10
+# Candidate neighbours per city in the boundary repair
+REPAIR_NEIGHBORS = 8
+# Tour positions on either side of a junction between parts queued for repair
+JUNCTION_WINDOW = 10
+# Side of the boundary-detection cells, in average city spacings
+BOUNDARY_CELL = 2.0
+
+def partition_cities(coords, num_parts, method='morton'):
+    """
+    Split the cities into about num_parts spatially compact parts.
+
+    :return: List of index arrays, one per non-empty part.
+    """
+    if method not in PARTITIONS:
+        raise ValueError(f"Unknown partition: {method}")
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    num_parts = max(1, min(num_parts, len(coords)))
+    morton = curve_order(coords, 'morton')
+    if method == 'morton':
+        # Consecutive runs of the Morton order share key prefixes, i.e. quadtree cells
+        return np.array_split(morton, num_parts)
+
+    if method == 'grid':
+        # Columns of equal count along x, each cut into rows of equal count along y
+        columns = math.ceil(math.sqrt(num_parts))
+        rows = math.ceil(num_parts / columns)
+        parts = []
+        for column in np.array_split(np.argsort(coords[:, 0], kind='stable'), columns):
+            column = column[np.argsort(coords[column, 1], kind='stable')]
+            parts.extend(np.array_split(column, rows))
+        return [part for part in parts if len(part)]
+
+    # k-means, seeded with the centroids of the Morton runs so the result is deterministic
+    centroids = np.array([coords[part].mean(axis=0) for part in np.array_split(morton, num_parts)])
+    labels = np.zeros(len(coords), dtype=np.int64)
+    for _ in range(KMEANS_ITERATIONS):
+        labels = _nearest_centroid(coords, centroids)
+        counts = np.bincount(labels, minlength=len(centroids))
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, coords)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+    order = np.argsort(labels, kind='stable')
+    bounds = np.cumsum(np.bincount(labels, minlength=len(centroids)))[:-1]
+    return [part for part in np.split(order, bounds) if len(part)]
+
+def _nearest_centroid(coords, centroids, chunk_size=65536):
+    labels = np.empty(len(coords), dtype=np.int64)
+    for start in range(0, len(coords), chunk_size):
+        block = coords[start:start + chunk_size]
+        distances = ((block[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2)
+        labels[start:start + chunk_size] = distances.argmin(axis=1)
+    return labels
+
+def part_order(coords, parts):
+    """Visiting order of the parts: a short cycle through their centroids."""
+    centroids = np.array([coords[part].mean(axis=0) for part in parts])
+    if len(parts) < 4:
+        return list(range(len(parts)))
+    geometry = CityGeometry.from_coords(centroids)
+    order = construct_tour(geometry)
+    improve_tour(geometry, order, '2opt')
+    return list(order)
+
+def solve_part(coords, algorithm, neighbors, expiry, construction='nearest_neighbor', two_level=False, kicks=None,
+               seed=0, cooling='geometric', candidates='nearest'):
+    """Construct and improve the tour of one part; runs in a worker process."""
+    geometry = CityGeometry.from_coords(coords)
+    deadline = Deadline.from_wall_clock(expiry)
+
+    start_initial = time.time()
+    tour = construct_tour(geometry, construction)
+    initial_tour = make_tour(tour)
+    initial_distance = geometry.tour_length(tour)
+    initial_time = round((time.time() - start_initial) * 1000, 2)
+
+    start_optimized = time.time()
+    converged = improve_tour(geometry, tour, algorithm, neighbors, deadline, None, two_level, kicks, seed, cooling,
+                             candidates)
+
+    return {
+        'initial_tour': initial_tour,
+        'tour': tour,
+        'initial_distance': initial_distance,
+        'optimized_distance': geometry.tour_length(tour),
+        'initial_time': initial_time,
+        'optimized_time': round((time.time() - start_optimized) * 1000, 2),
+        'converged': converged
+    }
+
+def stitch(coords, tours):
+    """
+    Join cyclic part tours, given in visiting order as global index arrays, into one tour.
+
+    Each part is opened at the edge (u, v) that best links it to the exit
+    city of the previous part and towards the centroid of the next one:
+    the cheapest of entry at v / exit at u and the reverse, scored for every
+    edge of the part at once.
+
+    :return: (tour, tour positions where a part starts).
+    """
+    centroids = [coords[part].mean(axis=0) for part in tours]
+    previous = centroids[-1]
+    pieces, junctions, position = [], [], 0
+    for idx, part in enumerate(tours):
+        part = np.asarray(part, dtype=np.int64)
+        junctions.append(position)
+        position += len(part)
+        if len(part) < 3:
+            pieces.append(part)
+            previous = coords[part[-1]]
+            continue
+        following = centroids[(idx + 1) % len(tours)]
+        points = coords[part]
+        after = np.roll(points, -1, axis=0)
+        edges = np.hypot(*(points - after).T)
+        # Forward: enter at part[j + 1] and leave at part[j]; backward: enter at part[j] and leave at part[j + 1]
+        forward = np.hypot(*(after - previous).T) + np.hypot(*(points - following).T) - edges
+        backward = np.hypot(*(points - previous).T) + np.hypot(*(after - following).T) - edges
+        j_forward, j_backward = int(forward.argmin()), int(backward.argmin())
+        if forward[j_forward] <= backward[j_backward]:
+            piece = np.roll(part, -(j_forward + 1))
+        else:
+            piece = np.roll(part[::-1], -(len(part) - 1 - j_backward))
+        pieces.append(piece)
+        previous = coords[piece[-1]]
+    return make_tour(np.concatenate(pieces).astype(np.int32).tolist()), junctions
+
+def boundary_cities(coords, labels, cell=BOUNDARY_CELL):
+    """
+    Cities close to a city of another part.
+
+    Cities are bucketed into square cells of cell average spacings; a city is
+    on the boundary when its cell or one of the eight around it holds cities
+    of more than one part. Vectorized, O(n).
+    """
+    low = coords.min(axis=0)
+    span = np.maximum(coords.max(axis=0) - low, 1e-12)
+    # Average spacing, floored so that nearly collinear inputs do not get a huge grid
+    side = cell * max(math.sqrt(span[0] * span[1] / len(coords)), float(span.max()) / len(coords))
+    cells = np.floor((coords - low) / side).astype(np.int64)
+    shape = cells.max(axis=0) + 1
+    lowest = np.full(shape, np.iinfo(np.int64).max)
+    highest = np.full(shape, -1)
+    np.minimum.at(lowest, (cells[:, 0], cells[:, 1]), labels)
+    np.maximum.at(highest, (cells[:, 0], cells[:, 1]), labels)
+
+    # Spread each cell's lowest and highest part label over its 3 x 3 block
+    padded_low = np.pad(lowest, 1, constant_values=np.iinfo(np.int64).max)
+    padded_high = np.pad(highest, 1, constant_values=-1)
+    block_low, block_high = lowest.copy(), highest.copy()
+    for dx in (0, 1, 2):
+        for dy in (0, 1, 2):
+            block_low = np.minimum(block_low, padded_low[dx:dx + shape[0], dy:dy + shape[1]])
+            block_high = np.maximum(block_high, padded_high[dx:dx + shape[0], dy:dy + shape[1]])
+    mixed = block_low != block_high
+    return np.flatnonzero(mixed[cells[:, 0], cells[:, 1]])
+
+def repair_boundaries(geometry, tour, junctions, labels, deadline=NO_DEADLINE):
+    """
+    2-opt + Or-opt over the stitched tour, starting only from cities near part boundaries and junctions.
+
+    Neighbour lists come lazily from a KDTree, so only the cities the search
+    reaches pay for them.
+
+    :return: True if the repair converged, False if the deadline cut it short.
+    """
+    num_cities = len(tour)
+    start = set(boundary_cities(geometry.coords, labels).tolist())
+    for junction in junctions:
+        for offset in range(-JUNCTION_WINDOW, JUNCTION_WINDOW):
+            start.add(tour[(junction + offset) % num_cities])
+    neighbors = LazyNeighbors(KDTree(geometry.coords), REPAIR_NEIGHBORS)
+    return local_search(tour, geometry.distance, neighbors, ('2opt', 'or_opt'), deadline, start=sorted(start))
+
+def decompose(geometry, algorithm, neighbors, deadline, method='morton', part_size=DEFAULT_PART_SIZE,
+              construction='nearest_neighbor', two_level=False, kicks=None, seed=0, cooling='geometric',
+              candidates='nearest'):
+    """
+    Partition-and-stitch solve: split the cities, solve the parts in parallel workers and join them.
+
+    :return: Dict with the stitched 'initial_tour' and repaired 'tour', and per-part stats under 'parts'.
+    """
+    coords = geometry.coords
+    parts = partition_cities(coords, math.ceil(geometry.num_cities / part_size), method)
+    parts = [parts[idx] for idx in part_order(coords, parts)]
+    labels = np.empty(geometry.num_cities, dtype=np.int64)
+    for label, part in enumerate(parts):
+        labels[part] = label
+
+    # Every part shares the request's absolute deadline, like the multi-start runs
+    expiry = deadline.wall_clock_expiry()
+    runs = run_in_pool(solve_part, [(coords[part], algorithm, neighbors, expiry, construction, two_level, kicks,
+                                     seed + label, cooling, candidates)
+                                    for label, part in enumerate(parts)])
+
+    initial_tour, _ = stitch(coords, [part[np.asarray(run['initial_tour'])] for part, run in zip(parts, runs)])
+    tour, junctions = stitch(coords, [part[np.asarray(run['tour'])] for part, run in zip(parts, runs)])
+    repaired = repair_boundaries(geometry, tour, junctions, labels, deadline)
+    for part, run in zip(parts, runs):
+        run['cities'] = len(part)
+        del run['initial_tour'], run['tour']
+
+    return {
+        'initial_tour': initial_tour,
+        'tour': tour,
+        'converged': repaired and all(run['converged'] for run in runs),
+        'parts': runs
+    }
@@ -0,0 +1,61 @@
+import hashlib
+from collections import OrderedDict
+
+# Default memory budget for cached distance tables (64 MiB)
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+
+def coordinate_key(coords):
+    """Digest of a coordinate array, so cached tables follow coordinates rather than city names."""
+    return hashlib.blake2b(coords.tobytes(), digest_size=16).hexdigest() + f':{len(coords)}'
+
+class DistanceCache:
+    """
+    Least-recently-used cache of distance tables (k-NN lists, matrices) bounded by a byte budget.
+
+    Entries are keyed by coordinate digest and table kind, so repeated requests
+    for the same coordinates reuse their tables while two requests that only
+    share city names never see each other's distances.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, key, compute):
+        """Return the cached table for key, computing and storing it on a miss."""
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = compute()
+        if value.nbytes <= self.max_bytes:
+            # Cached tables are shared between requests, so nobody may modify them
+            value.setflags(write=False)
+            self.entries[key] = value
+            self.current_bytes += value.nbytes
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.current_bytes -= evicted.nbytes
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        self.entries.clear()
+        self.current_bytes = 0
+
+    def stats(self):
+        return {
+            'entries': len(self.entries),
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
@@ -0,0 +1,63 @@
+import numpy as np
+from tour import make_tour
+
+# Largest instance solved exactly by default; the DP table holds 2^(n-1) * (n-1) entries
+EXACT_MAX_CITIES = 15
+# Hard cap on what a request may ask for: 20 cities already need a table of about 80 MB per array
+EXACT_HARD_MAX_CITIES = 20
+
+def held_karp_tour(distances):
+    """
+    Optimal tour by Held-Karp bitmask dynamic programming, vectorized over subsets.
+
+    cost[mask, j] is the shortest path that leaves city 0, visits exactly the
+    cities in mask (bit j stands for city j + 1) and ends at city j + 1. Masks
+    are filled one popcount layer at a time; inside a layer each end city is a
+    single NumPy minimum over every mask of the layer. Time is O(2^n * n^2),
+    memory O(2^n * n).
+
+    :param distances: Full (n, n) distance matrix.
+    :return: (tour starting at city 0, tour length).
+    """
+    distances = np.asarray(distances, dtype=np.float64)
+    num_cities = len(distances)
+    if num_cities < 3:
+        length = 2 * float(distances[0, 1]) if num_cities == 2 else 0.0
+        return make_tour(range(num_cities)), length
+
+    size = num_cities - 1
+    inner = distances[1:, 1:]
+    cost = np.full((1 << size, size), np.inf)
+    parent = np.full((1 << size, size), -1, dtype=np.int8)
+    singles = 1 << np.arange(size)
+    cost[singles, np.arange(size)] = distances[0, 1:]
+
+    # Group the masks by number of cities visited
+    masks = np.arange(1 << size)
+    popcount = np.zeros(1 << size, dtype=np.int64)
+    for bit in range(size):
+        popcount += (masks >> bit) & 1
+
+    for layer in range(2, size + 1):
+        layer_masks = masks[popcount == layer]
+        for end in range(size):
+            with_end = layer_masks[(layer_masks >> end) & 1 == 1]
+            # Cities outside the previous mask still hold inf, so they never win the minimum
+            candidates = cost[with_end ^ (1 << end)] + inner[:, end]
+            best = candidates.argmin(axis=1)
+            cost[with_end, end] = candidates[np.arange(len(with_end)), best]
+            parent[with_end, end] = best
+
+    full = (1 << size) - 1
+    closing = cost[full] + distances[1:, 0]
+    end = int(closing.argmin())
+    length = float(closing[end])
+
+    # Walk the parents back from the last city
+    path = []
+    mask = full
+    while end != -1:
+        path.append(end + 1)
+        mask, end = mask ^ (1 << end), int(parent[mask, end])
+    path.append(0)
+    return make_tour(reversed(path)), length
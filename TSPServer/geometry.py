@@ -0,0 +1,115 @@
+import math
+import numpy as np
+from tour import tour_view
+from distance_cache import coordinate_key
+from spatial_index import KDTree
+from condensed import CondensedMatrix, condensed_distances
+from candidates import CANDIDATE_SETS, quadrant_candidates
+
+# Largest dense distance table a solver should build; larger inputs run matrix-free
+MATRIX_MEMORY_BYTES = 256 * 1024 * 1024
+# Inputs at least this large get their neighbour lists from a k-d tree instead of dense distance blocks
+KNN_TREE_MIN_CITIES = 1024
+
+class CityGeometry:
+    """
+    City coordinates as contiguous float64 arrays with distance kernels over integer city indices.
+
+    Pass a DistanceCache to share the derived tables (neighbour lists, matrices)
+    between requests that send the same coordinates.
+    """
+
+    def __init__(self, cities, cache=None):
+        self.names = [city['name'] for city in cities]
+        self.num_cities = len(self.names)
+        self.coords = np.ascontiguousarray(
+            np.array([(city['x'], city['y']) for city in cities], dtype=np.float64).reshape(-1, 2))
+        # Plain float lists keep scalar lookups cheap inside Python-level move loops
+        self.xs = self.coords[:, 0].tolist()
+        self.ys = self.coords[:, 1].tolist()
+        self.cache = cache
+        self.key = coordinate_key(self.coords) if cache is not None else None
+
+    @classmethod
+    def from_coords(cls, coords, names=None, cache=None):
+        """Build a geometry straight from an (n, 2) coordinate array, e.g. inside a worker process."""
+        coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        if names is None:
+            names = [str(idx) for idx in range(len(coords))]
+        return cls([{'name': name, 'x': x, 'y': y} for name, (x, y) in zip(names, coords.tolist())], cache=cache)
+
+    def _cached(self, kind, compute):
+        if self.cache is None:
+            return compute()
+        return self.cache.lookup((self.key, kind), compute)
+
+    def distance(self, a, b):
+        """Euclidean distance between two city indices."""
+        return math.hypot(self.xs[a] - self.xs[b], self.ys[a] - self.ys[b])
+
+    def row_distances(self, a, cols=None):
+        """Distances from city a to every city, or to the cities in cols."""
+        points = self.coords if cols is None else self.coords[cols]
+        return np.hypot(points[:, 0] - self.xs[a], points[:, 1] - self.ys[a])
+
+    def distances_from(self, rows, cols=None):
+        """Distance block between the cities in rows and every city (or the cities in cols)."""
+        origins = self.coords[rows]
+        points = self.coords if cols is None else self.coords[cols]
+        return np.hypot(origins[:, 0, None] - points[None, :, 0], origins[:, 1, None] - points[None, :, 1])
+
+    def pairwise_distances(self):
+        """Full symmetric n x n distance matrix."""
+        return self._cached('pairwise', lambda: self.distances_from(np.arange(self.num_cities)))
+
+    def condensed_matrix(self):
+        """Distance matrix as a CondensedMatrix: each pair once, in float32."""
+        return CondensedMatrix(self.num_cities, self._cached('condensed', lambda: condensed_distances(self.coords)))
+
+    def matrix_fits(self, entry_bytes=8, budget=MATRIX_MEMORY_BYTES):
+        """True if an n x n table of entry_bytes per distance stays within the memory budget."""
+        return self.num_cities * self.num_cities * entry_bytes <= budget
+
+    def tour_length(self, tour):
+        """Length of the cyclic tour given as a sequence of city indices."""
+        if len(tour) < 2:
+            return 0.0
+        points = self.coords[tour_view(tour)]
+        deltas = points - np.roll(points, -1, axis=0)
+        return float(np.hypot(deltas[:, 0], deltas[:, 1]).sum())
+
+    def nearest_neighbors(self, k, chunk_size=1024):
+        """Return an (n, k) int32 table of each city's k nearest neighbours, closest first."""
+        k = max(0, min(k, self.num_cities - 1))
+        return self._cached(('knn', k), lambda: self._nearest_neighbors(k, chunk_size))
+
+    def candidate_neighbors(self, k, kind='nearest'):
+        """Return an (n, k) int32 candidate table of the given kind (see CANDIDATE_SETS), rows sorted by distance."""
+        if kind not in CANDIDATE_SETS:
+            raise ValueError(f"Unknown candidate set: {kind}")
+        if kind == 'nearest':
+            return self.nearest_neighbors(k)
+        k = max(0, min(k, self.num_cities - 1))
+        return self._cached(('quadrant', k), lambda: quadrant_candidates(self.coords, k))
+
+    def _nearest_neighbors(self, k, chunk_size):
+        table = np.empty((self.num_cities, k), dtype=np.int32)
+        if k == 0:
+            return table
+        if self.num_cities >= KNN_TREE_MIN_CITIES:
+            # One k-d tree query per city: O(n * k) memory and about O(n log n) time
+            tree = KDTree(self.coords)
+            xs, ys = self.xs, self.ys
+            for city in range(self.num_cities):
+                nearest = tree.nearest_k(xs[city], ys[city], k + 1)
+                table[city] = [idx for idx in nearest if idx != city][:k]
+            return table
+        # Work on row blocks so the temporary distance block stays small on large inputs
+        for start in range(0, self.num_cities, chunk_size):
+            rows = np.arange(start, min(start + chunk_size, self.num_cities))
+            block = self.distances_from(rows)
+            block[np.arange(len(rows)), rows] = np.inf
+            nearest = np.argpartition(block, k - 1, axis=1)[:, :k]
+            order = np.argsort(np.take_along_axis(block, nearest, axis=1), axis=1, kind='stable')
+            table[rows] = np.take_along_axis(nearest, order, axis=1)
+        return table
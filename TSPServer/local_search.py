@@ -0,0 +1,320 @@
+import random
+from collections import deque
+from deadline import NO_DEADLINE
+from tour import ArrayTour
+from two_level_tour import TwoLevelTour
+from two_opt import IMPROVEMENT_EPSILON, try_two_opt
+
+# Move types the combined local search can apply
+MOVES = ('2opt', 'or_opt', 'lk')
+
+# Longest segment an Or-opt move relocates
+OR_OPT_SEGMENT = 3
+
+# Most exchanges chained into one Lin-Kernighan move
+LK_DEPTH = 10
+
+# Longest of the two segments a double-bridge kick swaps
+KICK_SEGMENT = 50
+
+def move_segment(tour, prev, first, last, after, c, d, reverse):
+    """
+    Move the segment first..last from between prev and after into the edge (c, d).
+
+    Afterwards the tour holds edge (prev, after) and either (c, first), (last, d)
+    or, with reverse, (c, last), (first, d). first follows prev and d follows c
+    in the same direction. The move is made as up to three 2-opt exchanges.
+    """
+    if d == prev:
+        # Read the cycle the other way round so that c is not the segment's neighbour
+        prev, first, last, after, c, d = after, last, first, prev, d, c
+    tour.two_opt_move(prev, first, c, d)
+    if c != after:
+        tour.two_opt_move(prev, c, after, last)
+    if not reverse and first != last:
+        tour.two_opt_move(c, last, first, d)
+
+def try_or_opt(tour, distance, neighbors, city_a, max_segment=OR_OPT_SEGMENT):
+    """
+    Apply the first improving Or-opt move of a segment of 1..max_segment cities with city_a at one end.
+
+    The segment is reinserted, in either orientation, next to a neighbour of
+    one of its end cities; every candidate is scored from the three removed
+    and three added edges.
+
+    :return: Cities whose tour edges changed, or None if no move improves the tour.
+    """
+    num_cities = tour.num_cities
+    for forward in (True, False):
+        step, back = (tour.next, tour.prev) if forward else (tour.prev, tour.next)
+        segment = [city_a]
+        for _ in range(min(max_segment, num_cities - 4)):
+            if len(segment) > 1:
+                segment.append(step(segment[-1]))
+            # Orient the segment as prev -> first .. last -> after in reading direction step
+            first, last = segment[0], segment[-1]
+            prev, after = back(first), step(last)
+            removal_gain = distance(prev, first) + distance(last, after) - distance(prev, after)
+            if removal_gain <= IMPROVEMENT_EPSILON:
+                continue
+
+            for end in (first, last) if first != last else (first,):
+                for city_c in neighbors[end]:
+                    # Sorted neighbours: the edge to end alone already costs the whole removal gain
+                    if distance(end, city_c) >= removal_gain:
+                        break
+                    if city_c in segment:
+                        continue
+                    for c, d in ((city_c, step(city_c)), (back(city_c), city_c)):
+                        if c in segment or d in segment:
+                            continue
+                        base = removal_gain + distance(c, d)
+                        keep = base - distance(c, first) - distance(last, d)
+                        flip = base - distance(c, last) - distance(first, d)
+                        if keep > IMPROVEMENT_EPSILON or flip > IMPROVEMENT_EPSILON:
+                            move_segment(tour, prev, first, last, after, c, d, flip > keep)
+                            return (prev, after, first, last, c, d)
+    return None
+
+def _lk_step(tour, distance, neighbors, t1, t2, gain, added):
+    """Candidate (t3, t4) pairs for the next exchange of an LK chain, most promising first."""
+    t4_of = tour.prev if tour.next(t1) == t2 else tour.next
+    steps = []
+    for t3 in neighbors[t2]:
+        open_gain = gain - distance(t2, t3)
+        # Sorted neighbours: every later t3 leaves the chain without positive gain
+        if open_gain <= IMPROVEMENT_EPSILON:
+            break
+        if t3 == t1:
+            continue
+        t4 = t4_of(t3)
+        if t4 in (t1, t2) or (min(t3, t4), max(t3, t4)) in added:
+            continue
+        steps.append((open_gain + distance(t3, t4), t3, t4))
+    steps.sort(reverse=True)
+    return steps
+
+def try_lk(tour, distance, neighbors, t1, max_depth=LK_DEPTH):
+    """
+    Apply the first improving Lin-Kernighan move that starts by removing a tour edge at t1.
+
+    The move is a chain of 2-opt exchanges: each one removes the edge (t1, t2),
+    links t2 to a neighbour t3 and drops t3's edge to t4, leaving (t1, t4) to
+    be broken by the next exchange. The chain grows while its running gain stays
+    positive and stops at max_depth; the prefix with the best closed-up gain is
+    kept and the rest undone. Two exchanges already give the sequential 3-opt
+    moves that 2-opt and Or-opt cannot make. Every first exchange is tried,
+    deeper ones greedily take the best candidate, and edges added by the
+    chain are never removed again.
+
+    :return: Cities whose tour edges changed, or None if no move improves the tour.
+    """
+    for t2 in (tour.next(t1), tour.prev(t1)):
+        removed = distance(t1, t2)
+        for _, t3, t4 in _lk_step(tour, distance, neighbors, t1, t2, removed, set()):
+            flips = []
+            added = set()
+            best_gain, best_depth = 0.0, 0
+            gain, last = removed, t2
+
+            while True:
+                tour.two_opt_move(t1, last, t4, t3)
+                flips.append((t1, last, t4, t3))
+                added.add((min(last, t3), max(last, t3)))
+                gain += distance(t3, t4) - distance(last, t3)
+                closed = gain - distance(t4, t1)
+                if closed > best_gain:
+                    best_gain, best_depth = closed, len(flips)
+                last = t4
+                if len(flips) == max_depth:
+                    break
+                steps = _lk_step(tour, distance, neighbors, t1, last, gain, added)
+                if not steps:
+                    break
+                _, t3, t4 = steps[0]
+
+            # Undo the exchanges past the best prefix, newest first
+            for a, b, c, d in reversed(flips[best_depth:]):
+                tour.two_opt_move(a, c, b, d)
+            if best_gain > IMPROVEMENT_EPSILON:
+                touched = {t1}
+                for _, b, c, d in flips[:best_depth]:
+                    touched.update((b, c, d))
+                return touched
+    return None
+
+def local_search(tour, distance, neighbors, moves=MOVES, deadline=NO_DEADLINE, two_level=False, start=None):
+    """
+    Improve a cyclic tour in place with neighbour-list 2-opt, Or-opt and/or Lin-Kernighan moves.
+
+    All move types share one work queue with don't-look bits: a city is
+    examined until none of the selected moves around it improves the tour,
+    and the end cities of every applied move are queued again.
+
+    :param tour: Tour array of city indices in visiting order, without the closing city.
+    :param distance: Callable returning the distance between two city indices.
+    :param neighbors: Per-city candidate lists sorted by increasing distance.
+    :param moves: Move types to apply, any of MOVES.
+    :param deadline: Deadline polled before each city is examined.
+    :param two_level: Apply the moves on a TwoLevelTour instead of an ArrayTour.
+    :param start: Cities to queue at the start; None queues every city. With a
+                  subset, other cities are examined only once a move touches them.
+    :return: True if the tour reached a local optimum, False if the deadline cut it short.
+    """
+    unknown = set(moves) - set(MOVES)
+    if unknown:
+        raise ValueError(f"Unknown moves: {sorted(unknown)}")
+    if len(tour) < 5:
+        return True
+    if not two_level:
+        return _search(ArrayTour(tour), distance, neighbors, moves, deadline, start)
+
+    linked = TwoLevelTour(tour)
+    deadline.watch(linked)
+    converged = _search(linked, distance, neighbors, moves, deadline, start)
+    linked.store(tour)
+    return converged
+
+def _searches(moves):
+    searches = []
+    if '2opt' in moves:
+        searches.append(try_two_opt)
+    if 'lk' in moves:
+        searches.append(try_lk)
+    if 'or_opt' in moves:
+        searches.append(try_or_opt)
+    return searches
+
+def _search(tour, distance, neighbors, moves, deadline, start=None):
+    if start is None:
+        queue = deque(tour.cities())
+        active = [True] * tour.num_cities
+    else:
+        queue = deque(dict.fromkeys(start))
+        active = [False] * tour.num_cities
+        for city in queue:
+            active[city] = True
+    return _drain(tour, distance, neighbors, _searches(moves), queue, active, deadline)
+
+def _drain(tour, distance, neighbors, searches, queue, active, deadline):
+    """Examine queued cities until the queue is empty; active marks the cities in the queue."""
+    while queue:
+        if deadline.expired():
+            return False
+        city = queue.popleft()
+        active[city] = False
+
+        improved = True
+        while improved:
+            improved = False
+            for search in searches:
+                touched = search(tour, distance, neighbors, city)
+                if touched is not None:
+                    for other in touched:
+                        if not active[other]:
+                            active[other] = True
+                            queue.append(other)
+                    improved = True
+                    break
+
+    return True
+
+class _Journal:
+    """Tour wrapper that logs its 2-opt moves and their length change, so a rejected kick can be undone."""
+
+    def __init__(self, tour, distance):
+        self.tour = tour
+        self.distance = distance
+        self.num_cities = tour.num_cities
+        self.next, self.prev, self.between, self.cities = tour.next, tour.prev, tour.between, tour.cities
+        self.moves = []
+        self.delta = 0.0
+
+    def two_opt_move(self, a, b, c, d):
+        distance = self.distance
+        self.tour.two_opt_move(a, b, c, d)
+        self.moves.append((a, b, c, d))
+        self.delta += distance(a, c) + distance(b, d) - distance(a, b) - distance(c, d)
+
+    def commit(self):
+        self.moves = []
+        self.delta = 0.0
+
+    def rollback(self):
+        for a, b, c, d in reversed(self.moves):
+            self.tour.two_opt_move(a, c, b, d)
+        self.commit()
+
+def double_bridge(tour, rng, max_segment=KICK_SEGMENT):
+    """
+    Swap two short adjacent segments after a random city: A B C D becomes A C B D.
+
+    The double bridge is the non-sequential move that 2-opt, Or-opt and LK
+    chains cannot undo in one step. It is made as three 2-opt moves (reverse
+    B, reverse C, reverse both), so it costs O(max_segment) on either tour type.
+
+    :return: The six cities at the ends of the changed edges.
+    """
+    span = min(max_segment, (tour.num_cities - 2) // 2)
+    a_end = rng.randrange(tour.num_cities)
+    b_first = b_last = tour.next(a_end)
+    for _ in range(rng.randint(1, span) - 1):
+        b_last = tour.next(b_last)
+    c_first = c_last = tour.next(b_last)
+    for _ in range(rng.randint(1, span) - 1):
+        c_last = tour.next(c_last)
+    d_first = tour.next(c_last)
+
+    tour.two_opt_move(a_end, b_first, b_last, c_first)
+    tour.two_opt_move(b_first, c_first, c_last, d_first)
+    tour.two_opt_move(a_end, b_last, c_first, d_first)
+    return (a_end, b_first, b_last, c_first, c_last, d_first)
+
+def iterated_local_search(tour, distance, neighbors, moves=('2opt', 'or_opt'), kicks=None, deadline=NO_DEADLINE,
+                          two_level=False, seed=0):
+    """
+    Local search followed by double-bridge kicks, each kept only if it shortens the tour.
+
+    After the first local optimum every kick re-queues just its six end
+    cities, so re-optimization stays in the neighbourhood of the kicked edges
+    and costs about the same whatever the tour size. The kick and the moves
+    that follow it are journaled and rolled back unless together they make
+    the tour shorter.
+
+    :param kicks: Number of kicks to try; None tries one per city.
+    :param seed: Seed of the random kick positions, for reproducible runs.
+    :return: True if the kick budget was used up, False if the deadline cut it short.
+    """
+    unknown = set(moves) - set(MOVES)
+    if unknown:
+        raise ValueError(f"Unknown moves: {sorted(unknown)}")
+    if len(tour) < 8:
+        return local_search(tour, distance, neighbors, moves, deadline, two_level)
+
+    linked = TwoLevelTour(tour) if two_level else ArrayTour(tour)
+    deadline.watch(linked)
+    journal = _Journal(linked, distance)
+    searches = _searches(moves)
+    active = [True] * len(tour)
+    converged = _drain(journal, distance, neighbors, searches, deque(linked.cities()), active, deadline)
+    journal.commit()
+
+    rng = random.Random(seed)
+    remaining = len(tour) if kicks is None else kicks
+    while converged and remaining > 0:
+        if deadline.expired():
+            converged = False
+            break
+        remaining -= 1
+        queue = deque(dict.fromkeys(double_bridge(journal, rng)))
+        for city in queue:
+            active[city] = True
+        converged = _drain(journal, distance, neighbors, searches, queue, active, deadline)
+        if journal.delta < -IMPROVEMENT_EPSILON:
+            journal.commit()
+        else:
+            journal.rollback()
+
+    if two_level:
+        linked.store(tour)
+    return converged
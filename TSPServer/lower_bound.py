@@ -0,0 +1,222 @@
+import time
+import numpy as np
+from deadline import Deadline, NO_DEADLINE
+
+# Subgradient steps of the Held-Karp ascent
+ASCENT_ITERATIONS = 100
+# Candidate edges per city for the minimum spanning trees of the ascent
+ASCENT_NEIGHBORS = 10
+# Share of a deadline the bound may use, and the share of that left to the subgradient ascent;
+# the rest of the bound's budget goes to scoring the best penalties on the complete graph
+BOUND_TIME_SHARE = 0.25
+ASCENT_TIME_SHARE = 0.5
+# Measured cost of the complete-graph scoring per city pair, in nanoseconds
+DENSE_PAIR_NS = 50
+# Seconds between tour-length checks of a TargetStop
+TARGET_CHECK_INTERVAL = 0.05
+
+def dense_one_tree(geometry, penalties, special=0, deadline=NO_DEADLINE):
+    """
+    Minimum 1-tree over the complete graph with edge costs d(i, j) + pi_i + pi_j.
+
+    Prim's algorithm on every city but special, one vectorized row update per
+    added city (O(n^2) time, O(n) memory), plus the two cheapest edges at special.
+    The deadline is polled before every added city.
+
+    :return: (1-tree cost including penalties, degree of every city), or None if the deadline ran out.
+    """
+    n = geometry.num_cities
+    degree = np.zeros(n, dtype=np.int64)
+    in_tree = np.zeros(n, dtype=bool)
+    in_tree[special] = True
+    root = 1 if special == 0 else 0
+    in_tree[root] = True
+    best = geometry.row_distances(root) + penalties[root] + penalties
+    parent = np.full(n, root)
+    best[in_tree] = np.inf
+    total = 0.0
+
+    for _ in range(n - 2):
+        if deadline.expired():
+            return None
+        city = int(best.argmin())
+        total += best[city]
+        degree[city] += 1
+        degree[parent[city]] += 1
+        in_tree[city] = True
+        row = geometry.row_distances(city) + penalties[city] + penalties
+        closer = row < best
+        best[closer] = row[closer]
+        parent[closer] = city
+        best[in_tree] = np.inf
+
+    row = geometry.row_distances(special) + penalties[special] + penalties
+    row[special] = np.inf
+    two = np.argpartition(row, 1)[:2]
+    total += float(row[two].sum())
+    degree[two] += 1
+    degree[special] += 2
+    return total, degree
+
+def sparse_one_tree(edges_a, edges_b, lengths, special_row, penalties, special=0):
+    """
+    Minimum 1-tree restricted to candidate edges, by Kruskal with union-find.
+
+    :param special_row: Distances from special to every city, for its two 1-tree edges.
+    :return: (1-tree cost including penalties, degrees), or None if the candidates leave the tree disconnected.
+    """
+    n = len(penalties)
+    degree = np.zeros(n, dtype=np.int64)
+    costs = lengths + penalties[edges_a] + penalties[edges_b]
+    order = np.argsort(costs, kind='stable')
+    parent = list(range(n))
+
+    def find(city):
+        while parent[city] != city:
+            parent[city] = parent[parent[city]]
+            city = parent[city]
+        return city
+
+    added = 0
+    chosen = []
+    for edge in order.tolist():
+        a, b = int(edges_a[edge]), int(edges_b[edge])
+        root_a, root_b = find(a), find(b)
+        if root_a == root_b:
+            continue
+        parent[root_a] = root_b
+        chosen.append(edge)
+        added += 1
+        if added == n - 2:
+            break
+    if added < n - 2:
+        return None
+
+    chosen = np.array(chosen)
+    total = float(costs[chosen].sum())
+    np.add.at(degree, edges_a[chosen], 1)
+    np.add.at(degree, edges_b[chosen], 1)
+
+    row = special_row + penalties[special] + penalties
+    row[special] = np.inf
+    two = np.argpartition(row, 1)[:2]
+    total += float(row[two].sum())
+    degree[two] += 1
+    degree[special] += 2
+    return total, degree
+
+def held_karp_bound(geometry, upper_bound, iterations=ASCENT_ITERATIONS, neighbors=ASCENT_NEIGHBORS,
+                    deadline=NO_DEADLINE):
+    """
+    Held-Karp lower bound on the optimal tour length by subgradient ascent on 1-tree penalties.
+
+    Any penalty vector pi gives the bound w(pi) = cost of the minimum 1-tree
+    under d(i, j) + pi_i + pi_j minus 2 * sum(pi). Each step moves pi along
+    the degree excess (degree - 2) with a Polyak step towards upper_bound
+    (a known tour length), halving the step scale when the bound stalls.
+    The ascent runs on spanning trees of the k-nearest-neighbour graph to stay
+    cheap; the best penalties are then scored once on the complete graph, so
+    the returned value is a valid bound even if the candidates missed an edge.
+
+    Under a deadline the bound takes BOUND_TIME_SHARE of the remaining time,
+    ASCENT_TIME_SHARE of it for the ascent and the rest for the final
+    O(n^2) scoring, so most of the budget is left to the optimizer. When the
+    scoring is not expected to fit its share, no bound is computed at all.
+
+    :return: Lower bound (0.0 for fewer than 3 cities), or None if the final scoring ran out of time.
+    """
+    n = geometry.num_cities
+    if n < 3:
+        return 0.0 if n < 2 else 2 * geometry.distance(0, 1)
+    remaining_ms = deadline.remaining_ms()
+    ascent = deadline
+    if remaining_ms != float('inf'):
+        if n * n * DENSE_PAIR_NS / 1e6 > remaining_ms * BOUND_TIME_SHARE * (1 - ASCENT_TIME_SHARE):
+            return None
+        deadline = Deadline(remaining_ms * BOUND_TIME_SHARE)
+        ascent = Deadline(remaining_ms * BOUND_TIME_SHARE * ASCENT_TIME_SHARE)
+
+    table = geometry.nearest_neighbors(neighbors)
+    rows = np.repeat(np.arange(n, dtype=np.int64), table.shape[1])
+    cols = table.ravel().astype(np.int64)
+    keep = (rows != 0) & (cols != 0)
+    keys = np.unique(np.minimum(rows[keep], cols[keep]) * n + np.maximum(rows[keep], cols[keep]))
+    edges_a, edges_b = keys // n, keys % n
+    lengths = np.hypot(*(geometry.coords[edges_a] - geometry.coords[edges_b]).T)
+    special_row = geometry.row_distances(0)
+
+    penalties = np.zeros(n)
+    best_bound, best_penalties = -np.inf, penalties.copy()
+    scale, stalled = 2.0, 0
+    for _ in range(iterations):
+        if ascent.expired():
+            break
+        tree = sparse_one_tree(edges_a, edges_b, lengths, special_row, penalties)
+        if tree is None:
+            tree = dense_one_tree(geometry, penalties, deadline=ascent)
+            if tree is None:
+                break
+        cost, degree = tree
+        bound = cost - 2 * penalties.sum()
+        if bound > best_bound + 1e-9:
+            best_bound, best_penalties, stalled = bound, penalties.copy(), 0
+        else:
+            stalled += 1
+            if stalled >= 10:
+                scale, stalled = scale / 2, 0
+
+        excess = degree - 2
+        norm = float((excess * excess).sum())
+        if norm == 0:
+            # The 1-tree is a tour: the bound is tight
+            break
+        penalties = penalties + scale * max(upper_bound - bound, 0.0) / norm * excess
+
+    tree = dense_one_tree(geometry, best_penalties, deadline=deadline)
+    if tree is None:
+        return None
+    return float(tree[0] - 2 * best_penalties.sum())
+
+def gap(length, lower_bound):
+    """Relative distance of a tour length above the lower bound."""
+    if lower_bound <= 0:
+        return None
+    return max(0.0, float((length - lower_bound) / lower_bound))
+
+class TargetStop:
+    """
+    Deadline stand-in that also expires once the tour is within a target length.
+
+    Engines poll expired() between moves; the tour length is re-measured at
+    most every TARGET_CHECK_INTERVAL seconds, so the check stays cheap.
+    Engines that move cities on a copy of the tour (a TwoLevelTour) pass it
+    to watch(), so the live order is measured rather than the stale array.
+    """
+
+    def __init__(self, deadline, geometry, tour, target_length):
+        self.deadline = deadline
+        self.geometry = geometry
+        self.tour = tour
+        self.target_length = target_length
+        self.live = None
+        self.next_check = 0.0
+        self.reached = False
+
+    def watch(self, tour):
+        self.live = tour
+
+    def expired(self):
+        if self.reached or self.deadline.expired():
+            return True
+        now = time.perf_counter()
+        if now >= self.next_check:
+            self.next_check = now + TARGET_CHECK_INTERVAL
+            tour = self.tour if self.live is None else self.live.cities()
+            self.reached = self.geometry.tour_length(tour) <= self.target_length
+        return self.reached
+
+    def remaining_ms(self):
+        return self.deadline.remaining_ms()
+
+    def wall_clock_expiry(self):
+        return self.deadline.wall_clock_expiry()
@@ -0,0 +1,100 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from geometry import CityGeometry
+from construction import construct_tour
+from deadline import Deadline
+from lower_bound import TargetStop
+from solver import NEIGHBOR_ALGORITHMS, improve_tour
+from tour import rotate_tour
+
+# Worker processes shared by every multi-start request
+MULTI_START_WORKERS = os.cpu_count() or 1
+_executor = None
+
+def get_executor():
+    """Return the shared process pool, starting it on first use."""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=MULTI_START_WORKERS)
+    return _executor
+
+def reset_executor():
+    """Shut the shared pool down so that the next get_executor() starts a fresh one."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+def run_in_pool(function, calls):
+    """
+    Run function(*args) for every args tuple of calls on the shared pool; return the results in order.
+
+    A worker that dies hard (OOM kill, segfault) breaks the whole pool. The
+    pool is then replaced and the calls are retried once, so one crash does
+    not fail every later request; a second break is raised to the caller.
+    """
+    for attempt in range(2):
+        try:
+            executor = get_executor()
+            futures = [executor.submit(function, *args) for args in calls]
+            return [future.result() for future in futures]
+        except BrokenProcessPool:
+            reset_executor()
+            if attempt:
+                raise
+
+def spread_starts(num_cities, num_starts):
+    """Pick start indices evenly spaced along the curve order, always including city 0."""
+    num_starts = max(1, min(num_starts, num_cities))
+    return sorted({(i * num_cities) // num_starts for i in range(num_starts)})
+
+def run_start(coords, start, algorithm, neighbors, expiry, neighbor_table=None, construction='nearest_neighbor',
+              two_level=False, target_length=None, kicks=None, seed=0, cooling='geometric', candidates='nearest'):
+    """Construct a tour from one start city and improve it; runs in a worker process."""
+    geometry = CityGeometry.from_coords(coords)
+    deadline = Deadline.from_wall_clock(expiry)
+
+    start_initial = time.time()
+    tour = construct_tour(geometry, construction, start)
+    initial_distance = geometry.tour_length(tour)
+    initial_time = round((time.time() - start_initial) * 1000, 2)
+
+    # Every run stops once its tour is as short as the target derived from the lower bound
+    if target_length is not None:
+        deadline = TargetStop(deadline, geometry, tour, target_length)
+
+    start_optimized = time.time()
+    # Offsetting the seed by the start city keeps the random draws of the runs apart
+    converged = improve_tour(geometry, tour, algorithm, neighbors, deadline, neighbor_table, two_level, kicks, seed + start,
+                             cooling, candidates)
+    tour = rotate_tour(tour, start)
+
+    return {
+        'start': start,
+        'tour': tour,
+        'initial_distance': initial_distance,
+        'optimized_distance': geometry.tour_length(tour),
+        'initial_time': initial_time,
+        'optimized_time': round((time.time() - start_optimized) * 1000, 2),
+        'converged': converged
+    }
+
+def multi_start(geometry, num_starts, algorithm, neighbors, deadline, construction='nearest_neighbor', two_level=False,
+                target_length=None, kicks=None, seed=0, cooling='geometric', candidates='nearest'):
+    """
+    Run independent construction + local search from several start cities in parallel.
+
+    :return: The run with the shortest optimized tour and the list of all runs, in start order.
+    """
+    starts = spread_starts(geometry.num_cities, num_starts)
+    neighbor_table = geometry.candidate_neighbors(neighbors, candidates) if algorithm in NEIGHBOR_ALGORITHMS else None
+    # Every run shares the request's absolute deadline, even when it waits for a free worker
+    expiry = deadline.wall_clock_expiry()
+
+    runs = run_in_pool(run_start, [(geometry.coords, start, algorithm, neighbors, expiry, neighbor_table, construction,
+                                    two_level, target_length, kicks, seed, cooling, candidates)
+                                   for start in starts])
+    best = min(runs, key=lambda run: run['optimized_distance'])
+    return best, runs
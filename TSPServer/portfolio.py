@@ -0,0 +1,142 @@
+import multiprocessing
+import queue
+import time
+from construction import construct_tour
+from deadline import Deadline, NO_DEADLINE
+from geometry import CityGeometry
+from lower_bound import TargetStop
+from tour import rotate_tour
+from two_opt import two_opt, two_opt_neighbors, two_opt_vectorized
+
+# Strategies of the repo's servers, rebuilt on the shared modules:
+#   'in_place_2opt'   TSPServer: nearest neighbour + full 2-opt sweep, rows scored with NumPy
+#   'restart_2opt'    TCPUDP: the same sweep restarted after the first improving row
+#   'full_evaluation' TruePathTCPUP: scalar 2-opt over the condensed distance matrix (neighbour lists if it does not fit)
+#   'insertion_2opt'  SingleThreadAdv: farthest insertion + neighbour-list 2-opt
+STRATEGIES = ('in_place_2opt', 'restart_2opt', 'full_evaluation', 'insertion_2opt')
+
+# Candidate list size of the neighbour-list strategies
+PORTFOLIO_NEIGHBORS = 10
+# Bytes per n x n entry of the condensed float32 triangle, as in TruePathTCPUP
+MATRIX_ENTRY_BYTES = 2
+# Time past the deadline allowed for workers to hand in their tours before they are cancelled
+PORTFOLIO_GRACE_MS = 500
+# Seconds between checks for workers that died without handing in a tour
+PORTFOLIO_POLL_SECONDS = 0.1
+
+def run_strategy(coords, strategy, expiry, target_length, results):
+    """Run one strategy on the cities and put its result on the results queue; runs in a worker process."""
+    geometry = CityGeometry.from_coords(coords)
+    deadline = Deadline.from_wall_clock(expiry)
+
+    start_time = time.time()
+    construction = 'farthest_insertion' if strategy == 'insertion_2opt' else 'nearest_neighbor'
+    tour = construct_tour(geometry, construction)
+    initial_tour = list(tour)
+    initial_time = round((time.time() - start_time) * 1000, 2)
+    if target_length is not None:
+        deadline = TargetStop(deadline, geometry, tour, target_length)
+
+    if strategy == 'in_place_2opt':
+        converged = two_opt_vectorized(tour, geometry.coords, deadline)
+    elif strategy == 'restart_2opt':
+        converged = two_opt_vectorized(tour, geometry.coords, deadline, restart=True)
+    elif strategy == 'full_evaluation' and geometry.matrix_fits(MATRIX_ENTRY_BYTES):
+        converged = two_opt(tour, geometry.condensed_matrix().distance, deadline)
+    else:
+        converged = two_opt_neighbors(tour, geometry.distance, geometry.nearest_neighbors(PORTFOLIO_NEIGHBORS).tolist(),
+                                      deadline)
+
+    results.put({
+        'strategy': strategy,
+        'initial_tour': initial_tour,
+        'tour': rotate_tour(list(tour), initial_tour[0]),
+        'initial_distance': geometry.tour_length(initial_tour),
+        'optimized_distance': geometry.tour_length(tour),
+        'initial_time': initial_time,
+        'optimized_time': round((time.time() - start_time) * 1000, 2),
+        'converged': converged
+    })
+
+def race(geometry, strategies=STRATEGIES, deadline=NO_DEADLINE, target_length=None):
+    """
+    Run several strategies on the same cities in parallel processes and keep the shortest tour.
+
+    Every strategy gets its own process rather than a slot in the shared
+    multi-start pool, so that losers can be terminated: the race ends when
+    the first tour within target_length comes in, when all strategies have
+    finished, or PORTFOLIO_GRACE_MS after the deadline. Strategies poll the
+    deadline themselves and hand in their best tour when it expires.
+
+    Workers that exit without a result (an exception, an OOM kill) are
+    noticed within PORTFOLIO_POLL_SECONDS and end the race once no other
+    worker is left running.
+
+    :return: The shortest run (None if no strategy reported in time) and the list of
+             per-strategy stats, in strategies order; runs that were stopped before
+             they reported are marked 'cancelled', runs whose worker died 'failed'.
+    """
+    for strategy in strategies:
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown strategy: {strategy}")
+    strategies = list(dict.fromkeys(strategies))
+    expiry = deadline.wall_clock_expiry()
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=run_strategy, args=(geometry.coords, strategy, expiry, target_length, results),
+                                       daemon=True)
+               for strategy in strategies]
+    for worker in workers:
+        worker.start()
+
+    runs = {}
+    best = None
+    give_up = None if expiry is None else expiry + PORTFOLIO_GRACE_MS / 1000
+    while len(runs) < len(workers):
+        timeout = PORTFOLIO_POLL_SECONDS
+        if give_up is not None:
+            timeout = min(timeout, max(0.0, give_up - time.time()))
+        try:
+            run = results.get(timeout=timeout)
+        except queue.Empty:
+            if give_up is not None and time.time() >= give_up:
+                break
+            # A worker that died put nothing; stop waiting once every worker without a result has exited
+            if all(not worker.is_alive() for strategy, worker in zip(strategies, workers) if strategy not in runs):
+                try:
+                    run = results.get(timeout=PORTFOLIO_POLL_SECONDS)
+                except queue.Empty:
+                    break
+            else:
+                continue
+        runs[run['strategy']] = run
+        if best is None or run['optimized_distance'] < best['optimized_distance']:
+            best = run
+        if target_length is not None and run['optimized_distance'] <= target_length:
+            break
+
+    # Cancel the strategies still running
+    cancelled = set()
+    for strategy, worker in zip(strategies, workers):
+        if worker.is_alive():
+            worker.terminate()
+            cancelled.add(strategy)
+        worker.join()
+    results.close()
+
+    stats = []
+    for strategy, worker in zip(strategies, workers):
+        if strategy in runs:
+            stats.append({
+                'strategy': strategy,
+                'initial_distance': runs[strategy]['initial_distance'],
+                'optimized_distance': runs[strategy]['optimized_distance'],
+                'optimized_time': runs[strategy]['optimized_time'],
+                'converged': runs[strategy]['converged'],
+                'cancelled': False,
+                'failed': False
+            })
+        elif strategy in cancelled:
+            stats.append({'strategy': strategy, 'cancelled': True, 'failed': False})
+        else:
+            stats.append({'strategy': strategy, 'cancelled': False, 'failed': True, 'exitcode': worker.exitcode})
+    return best, stats
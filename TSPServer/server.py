@@ -1,9 +1,24 @@
-import math
 import socket
 import select
 import json
 from ratelimit import limits, sleep_and_retry
 import time
+import numpy as np
+from geometry import CityGeometry
+from space_filling import curve_sort
+from construction import CONSTRUCTIONS, construct_tour
+from tour import encode_array, encode_path, is_valid_tour, make_tour, rotate_tour
+from distance_cache import DistanceCache
+from deadline import Deadline
+from solver import ALGORITHMS, DEFAULT_NEIGHBORS, improve_tour
+from annealing import COOLING_SCHEDULES
+from candidates import CANDIDATE_SETS
+from decomposition import DEFAULT_PART_SIZE, MIN_PART_SIZE, PARTITIONS, decompose
+from multi_start import multi_start
+from batch import BATCH_MAX_CITIES, BATCH_SLICE, solve_batch
+from portfolio import STRATEGIES, race
+from exact import EXACT_HARD_MAX_CITIES, EXACT_MAX_CITIES, held_karp_tour
+from lower_bound import TargetStop, gap, held_karp_bound
 
 class QPRx2025:
     def __init__(self, seed=0):
@@ -114,111 +129,339 @@ processed_requests = {}
 REQUEST_LIMIT = 500
 TIME_PERIOD = 60 # 60 seconds
 CACHE_SIZE_LIMIT = 2000  # Define cache size limit
-
-
-# Memoized dictionary to store distances for efficiency
-memoized_distances = {}
-
-# Higher-order function to memoize distances
-def memoize_distance(func):
-    def wrapper(city1, city2):
-        key = frozenset((city1['name'], city2['name']))
-        if key not in memoized_distances:
-            memoized_distances[key] = func(city1, city2)
-        return memoized_distances[key]
-    return wrapper
-
-@memoize_distance
-def calculate_distance(city1, city2):
-    return math.hypot(city1['x'] - city2['x'], city1['y'] - city2['y'])
-
-def total_distance(path):
-    return sum(calculate_distance(path[i], path[(i + 1) % len(path)]) for i in range(len(path)))
-
-def morton_order(city):
-    def interleave_bits(x, y):
-        def spread_bits(v):
-            v = (v | (v << 8)) & 0x00FF00FF
-            v = (v | (v << 4)) & 0x0F0F0F0F
-            v = (v | (v << 2)) & 0x33333333
-            v = (v | (v << 1)) & 0x55555555
-            return v
-        return spread_bits(x) | (spread_bits(y) << 1)
-    x = int(city['x'] * 10000)
-    y = int(city['y'] * 10000)
-    return interleave_bits(x, y)
-
-def solve_tsp(cities):
-    """Find and optimize a path using Morton order, nearest neighbor heuristic, and 2-opt algorithm."""
+DISTANCE_CACHE_BYTES = 64 * 1024 * 1024  # Memory budget for cached distance tables
+
+# Neighbour lists and matrices keyed by coordinates, shared by repeated requests
+distance_cache = DistanceCache(max_bytes=DISTANCE_CACHE_BYTES)
+
+
+def solve_tsp(cities, algorithm='2opt', neighbors=DEFAULT_NEIGHBORS, deadline_ms=None, starts=1,
+              construction='nearest_neighbor', two_level=False, exact_max_cities=EXACT_MAX_CITIES, lower_bound=False,
+              target_gap=None, kicks=None, seed=None, cooling='geometric', partition=None, part_size=DEFAULT_PART_SIZE,
+              candidates='nearest', portfolio=None, target_length=None):
+    """
+    Find and optimize a path using Morton order, nearest neighbor heuristic, and 2-opt algorithm.
+
+    construction picks the start tour: 'nearest_neighbor', or a 'morton' or
+    'hilbert' space-filling-curve tour, which combined with algorithm 'none'
+    or '2opt_neighbors' is the fast path for very large inputs.
+
+    With deadline_ms set, optimization stops once the budget (counted from the
+    start of the call) runs out and the best tour so far is returned with
+    'converged' set to False. With starts > 1, that many start cities spread
+    along the Morton order are solved in parallel worker processes and the
+    shortest tour wins; per-start stats are returned under 'starts'. two_level
+    makes the neighbour-list algorithms reverse segments on a two-level list
+    tour rather than the flat array.
+
+    Inputs of at most exact_max_cities cities (capped at
+    EXACT_HARD_MAX_CITIES, the DP table grows as 2^n) skip the heuristics
+    and are solved exactly with Held-Karp; 'optimal' is True in that case.
+
+    With lower_bound (or a target_gap) a Held-Karp 1-tree bound is computed
+    after construction and reported as 'lower_bound' with the relative 'gap'
+    of the result; optimization stops early, with 'converged' False, once the
+    tour is within target_gap (e.g. 0.05 for 5%) of that bound.
+
+    Algorithm 'ils' keeps improving a converged tour with kicks double-bridge
+    perturbations (one per city when None) until they or the deadline run out.
+    Algorithm 'anneal' runs simulated annealing with the cooling schedule
+    ('geometric' or 'linear'). Their random draws follow seed; without one a
+    seed is drawn from QPRx2025 and returned as 'seed' so the run can be
+    repeated.
+
+    With partition ('morton', 'grid' or 'kmeans') inputs larger than
+    part_size are split into parts of about part_size cities, solved in
+    parallel worker processes and stitched back together, followed by a
+    2-opt + Or-opt repair around the part boundaries; per-part stats are
+    returned under 'parts'.
+
+    candidates picks the neighbour lists of the neighbour-list algorithms:
+    the 'nearest' cities, or 'quadrant' neighbours, the closest cities in
+    each quadrant around a city, which keep links across gaps between
+    clusters.
+
+    With portfolio (a list of STRATEGIES) those strategies race on the
+    input in parallel processes: the shortest tour at the deadline wins, or
+    the first one within target_length (or target_gap of the lower bound),
+    and the others are cancelled; per-strategy stats are returned under
+    'portfolio'.
+    """
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"Unknown algorithm: {algorithm}")
+    if construction not in CONSTRUCTIONS:
+        raise ValueError(f"Unknown construction: {construction}")
+    if cooling not in COOLING_SCHEDULES:
+        raise ValueError(f"Unknown cooling schedule: {cooling}")
+    if partition is not None and partition not in PARTITIONS:
+        raise ValueError(f"Unknown partition: {partition}")
+    if candidates not in CANDIDATE_SETS:
+        raise ValueError(f"Unknown candidate set: {candidates}")
+    deadline = Deadline(deadline_ms)
+    if seed is None:
+        seed = qprx.quantum_polls_relay(1000000)
     
     # Sort cities based on Morton order
-    cities_sorted = sorted(cities, key=morton_order)
+    cities_sorted = curve_sort(cities, 'morton')
+
+    # Coordinates as float64 arrays; the solver works on indices into cities_sorted
+    geometry = CityGeometry(cities_sorted, cache=distance_cache)
+
+    if geometry.num_cities <= min(exact_max_cities, EXACT_HARD_MAX_CITIES):
+        return solve_exact(geometry, cities_sorted, construction, seed)
+
+    compute_bound = lower_bound or target_gap is not None
+    if portfolio:
+        return solve_portfolio(geometry, cities_sorted, portfolio, deadline, compute_bound, target_gap, target_length,
+                               seed)
+
+    if partition is not None and geometry.num_cities > part_size:
+        return solve_partitioned(geometry, cities_sorted, algorithm, neighbors, deadline, construction, two_level, kicks,
+                                 seed, cooling, partition, part_size, candidates)
+
+    if starts > 1:
+        return solve_multi_start(geometry, cities_sorted, algorithm, neighbors, deadline, starts, construction, two_level,
+                                 compute_bound, target_gap, kicks, seed, cooling, candidates)
 
     # Measure time for initial solution using nearest neighbor heuristic
     start_initial = time.time()
     
-    # Nearest neighbor heuristic and path initialization
-    unvisited = set(city['name'] for city in cities_sorted)
-    path = [cities_sorted[0]]
-    current_city = cities_sorted[0]
-
-    while unvisited:
-        unvisited.discard(current_city['name'])
-        closest = min((city for city in cities_sorted if city['name'] in unvisited), 
-                      key=lambda city: calculate_distance(current_city, city), 
-                      default=None)
-        if closest is None:
-            break
-
-        path.append(closest)
-        current_city = closest
-
-    # Ensure path returns to start to form a complete tour
-    path.append(path[0])
-    initial_distance = total_distance(path)
+    # Nearest neighbor heuristic (or curve order); the tour is an int32 array of city
+    # indices and names and coordinates are only looked up again when the response is built
+    tour = construct_tour(geometry, construction)
+    initial_tour = make_tour(tour)
+    initial_distance = geometry.tour_length(tour)
     end_initial = time.time()
     initial_time = round((end_initial - start_initial) * 1000, 2)  # Convert to milliseconds and round to 2 decimal places
 
+    # Lower bound from the 1-tree ascent; a target gap turns it into a stopping length
+    bound = None
+    stop = deadline
+    if compute_bound:
+        bound = held_karp_bound(geometry, initial_distance, deadline=deadline)
+        if target_gap is not None and bound is not None:
+            stop = TargetStop(deadline, geometry, tour, bound * (1 + target_gap))
+
     # Measure time for optimizing the path using 2-opt
     start_optimized = time.time()
     
-    # 2-opt optimization
-    improvement_threshold = 1e-6
-    improved = True
-
-    while improved:
-        improved = False
-        for i in range(1, len(path) - 2):
-            for j in range(i + 1, len(path) - 1):
-                if calculate_distance(path[i - 1], path[i]) + calculate_distance(path[j], path[(j + 1) % len(path)]) > \
-                   calculate_distance(path[i - 1], path[j]) + calculate_distance(path[i], path[(j + 1) % len(path)]):
-                    path[i:j + 1] = reversed(path[i:j + 1])
-                    improved = True
-
-    optimized_distance = total_distance(path)
+    converged = improve_tour(geometry, tour, algorithm, neighbors, stop, two_level=two_level, kicks=kicks, seed=seed,
+                             cooling=cooling, candidates=candidates)
+
+    # Rotate the tour so it still starts and ends at the first city
+    tour = rotate_tour(tour, initial_tour[0])
+
+    optimized_distance = geometry.tour_length(tour)
     end_optimized = time.time()
     optimized_time = round((end_optimized - start_optimized) * 1000, 2)  # Convert to milliseconds and round to 2 decimal places
 
     # Validation checks
-    unique_cities = {city['name'] for city in path}
-    all_cities = {city['name'] for city in cities}
-    is_valid_path = unique_cities == all_cities and path[0] == path[-1]
+    report_validation(tour, geometry.num_cities)
 
-    optimized_array = [{'name': city['name'], 'x': city['x'], 'y': city['y']} for city in path]
+    return build_response(geometry.names, cities_sorted, initial_tour, tour, initial_distance, optimized_distance,
+                          initial_time, optimized_time, converged, lower_bound=bound, seed=seed)
 
-    if is_valid_path:
+def report_validation(tour, num_cities):
+    """Print whether the tour visits every city exactly once."""
+    if is_valid_tour(tour, num_cities):
         print("Path validation successful: Each city is visited once, and path returns to origin.")
     else:
         print("Path validation failed: Path does not include all cities or does not return to the origin.")
 
-    return {
-        'initial_path': [city['name'] for city in path],
-        'optimized_path': [city['name'] for city in path],
+def build_response(names, cities, initial_tour, tour, initial_distance, optimized_distance, initial_time, optimized_time,
+                   converged, optimal=False, lower_bound=None, seed=None, **extra):
+    """
+    Response of one solve, shared by every solve path; tours are city indices into names and cities.
+
+    extra holds path-specific fields, such as per-run stats, appended after the common ones.
+    """
+    response = {
+        'initial_path': encode_path(initial_tour, names),
+        'optimized_path': encode_path(tour, names),
         'initial_distance': initial_distance,
         'optimized_distance': optimized_distance,
         'initial_time': initial_time,
         'optimized_time': optimized_time,
-        'optimized_array': optimized_array
+        'optimized_array': encode_array(tour, cities),
+        'converged': converged,
+        'optimal': optimal,
+        'lower_bound': lower_bound,
+        'gap': None if lower_bound is None else gap(optimized_distance, lower_bound),
+        'seed': seed
+    }
+    response.update(extra)
+    return response
+
+def solve_exact(geometry, cities_sorted, construction, seed=None):
+    """Solve a small instance to optimality; the constructed tour is still reported as the initial solution."""
+    start_initial = time.time()
+    initial_tour = construct_tour(geometry, construction)
+    initial_distance = geometry.tour_length(initial_tour)
+    initial_time = round((time.time() - start_initial) * 1000, 2)
+
+    start_optimized = time.time()
+    tour, _ = held_karp_tour(geometry.pairwise_distances())
+    optimized_distance = geometry.tour_length(tour)
+    optimized_time = round((time.time() - start_optimized) * 1000, 2)
+
+    # The optimum is its own lower bound
+    return build_response(geometry.names, cities_sorted, initial_tour, tour, initial_distance, optimized_distance,
+                          initial_time, optimized_time, True, optimal=True, lower_bound=optimized_distance, seed=seed)
+
+def solve_multi_start(geometry, cities_sorted, algorithm, neighbors, deadline, starts, construction, two_level=False,
+                      compute_bound=False, target_gap=None, kicks=None, seed=0, cooling='geometric',
+                      candidates='nearest'):
+    """Solve from several start cities in parallel and report the best tour with per-start stats."""
+    bound = None
+    target_length = None
+    if compute_bound:
+        bound = held_karp_bound(geometry, geometry.tour_length(construct_tour(geometry, construction)), deadline=deadline)
+        if target_gap is not None and bound is not None:
+            target_length = bound * (1 + target_gap)
+
+    start_optimized = time.time()
+    best, runs = multi_start(geometry, starts, algorithm, neighbors, deadline, construction, two_level, target_length,
+                             kicks, seed, cooling, candidates)
+    optimized_time = round((time.time() - start_optimized) * 1000, 2)  # Wall-clock time of the parallel runs
+
+    report_validation(best['tour'], geometry.num_cities)
+
+    best_initial = construct_tour(geometry, construction, best['start'])
+    return build_response(geometry.names, cities_sorted, best_initial, best['tour'], best['initial_distance'],
+                          best['optimized_distance'], best['initial_time'], optimized_time, best['converged'],
+                          lower_bound=bound, seed=seed, starts=[{
+                              'start': geometry.names[run['start']],
+                              'initial_distance': run['initial_distance'],
+                              'optimized_distance': run['optimized_distance'],
+                              'initial_time': run['initial_time'],
+                              'optimized_time': run['optimized_time'],
+                              'converged': run['converged']
+                          } for run in runs])
+
+def solve_portfolio(geometry, cities_sorted, strategies, deadline, compute_bound=False, target_gap=None,
+                    target_length=None, seed=0):
+    """Race several solver strategies in parallel processes and report the winning tour with per-strategy stats."""
+    start_optimized = time.time()
+    bound = None
+    if compute_bound:
+        bound = held_karp_bound(geometry, geometry.tour_length(construct_tour(geometry)), deadline=deadline)
+        if target_gap is not None and bound is not None and target_length is None:
+            target_length = bound * (1 + target_gap)
+
+    best, runs = race(geometry, strategies, deadline, target_length)
+    if best is None:
+        # No strategy handed in a tour before it was cancelled; fall back to the plain construction
+        tour = construct_tour(geometry)
+        best = {'strategy': None, 'initial_tour': list(tour), 'tour': list(tour),
+                'initial_distance': geometry.tour_length(tour), 'optimized_distance': geometry.tour_length(tour),
+                'initial_time': 0.0, 'converged': False}
+    optimized_time = round((time.time() - start_optimized) * 1000, 2)  # Wall-clock time of the whole race
+
+    report_validation(best['tour'], geometry.num_cities)
+
+    return build_response(geometry.names, cities_sorted, best['initial_tour'], best['tour'], best['initial_distance'],
+                          best['optimized_distance'], best['initial_time'], optimized_time, best['converged'],
+                          lower_bound=bound, seed=seed, strategy=best['strategy'], portfolio=runs)
+
+def solve_partitioned(geometry, cities_sorted, algorithm, neighbors, deadline, construction, two_level, kicks, seed,
+                      cooling, partition, part_size, candidates='nearest'):
+    """Solve a large instance part by part in parallel and report the stitched tour with per-part stats."""
+    start_optimized = time.time()
+    result = decompose(geometry, algorithm, neighbors, deadline, partition, part_size, construction, two_level, kicks,
+                       seed, cooling, candidates)
+    optimized_time = round((time.time() - start_optimized) * 1000, 2)  # Wall-clock time of partition, solves and repair
+
+    # Start and end at the first city of the stitched initial tour, like the single-run path
+    tour = rotate_tour(result['tour'], result['initial_tour'][0])
+    report_validation(tour, geometry.num_cities)
+
+    return build_response(geometry.names, cities_sorted, result['initial_tour'], tour,
+                          geometry.tour_length(result['initial_tour']), geometry.tour_length(tour),
+                          max(part['initial_time'] for part in result['parts']), optimized_time, result['converged'],
+                          seed=seed, parts=result['parts'])
+
+def solve_tsp_batch(instances, deadline_ms=None):
+    """
+    Solve many small independent instances, e.g. thousands of 8-30 stop tours, in one call.
+
+    Instances of equal size, up to BATCH_MAX_CITIES cities, are stacked in
+    slices of up to BATCH_SLICE instances and run through nearest-neighbour
+    construction and best-improvement 2-opt together as NumPy arrays
+    (TSPServer/batch.py); larger ones go through
+    solve_tsp with the default options. Tours keep the given city order's
+    first city as their start. Results come back under 'results' in input
+    order, each with the fields of a single solve_tsp response; stacked
+    instances report the construction and 2-opt times of their whole slice,
+    and no lower bound, gap or seed (the batch path draws nothing).
+    """
+    deadline = Deadline(deadline_ms)
+    start_time = time.time()
+    results = [None] * len(instances)
+    groups = {}
+    for idx, cities in enumerate(instances):
+        if len(cities) > BATCH_MAX_CITIES:
+            results[idx] = solve_tsp(cities, deadline_ms=None if deadline_ms is None else deadline.remaining_ms())
+        else:
+            groups.setdefault(len(cities), []).append(idx)
+
+    for num_cities, group in groups.items():
+        for start in range(0, len(group), BATCH_SLICE):
+            members = group[start:start + BATCH_SLICE]
+            coords = np.array([[(city['x'], city['y']) for city in instances[idx]] for idx in members],
+                              dtype=np.float64).reshape(len(members), num_cities, 2)
+            solved = solve_batch(coords, deadline)
+            for row, idx in enumerate(members):
+                cities = instances[idx]
+                results[idx] = build_response([city['name'] for city in cities], cities,
+                                              solved['initial_tours'][row].tolist(), solved['tours'][row].tolist(),
+                                              float(solved['initial_lengths'][row]), float(solved['lengths'][row]),
+                                              solved['initial_time'], solved['optimized_time'],
+                                              bool(solved['converged'][row]))
+
+    return {
+        'results': results,
+        'batch_time': round((time.time() - start_time) * 1000, 2)  # Wall-clock time of the whole batch
+    }
+
+def portfolio_strategies(portfolio):
+    """Strategies named by a request's 'portfolio' field: true selects all of them, a list picks some."""
+    if portfolio is True:
+        return STRATEGIES
+    if portfolio is None or portfolio is False:
+        return None
+    if not isinstance(portfolio, list) or not all(isinstance(strategy, str) for strategy in portfolio):
+        raise ValueError(f"portfolio must be true, false or a list of strategy names: {portfolio!r}")
+    return tuple(portfolio) or None
+
+def request_options(request_data):
+    """Collect the optional solver settings of a request as keyword arguments for solve_tsp."""
+    deadline_ms = request_data.get('deadline_ms')
+    if deadline_ms is None and request_data.get('time_budget') is not None:
+        deadline_ms = float(request_data['time_budget']) * 1000  # time_budget is given in seconds
+    neighbors = int(request_data.get('neighbors', DEFAULT_NEIGHBORS))
+    if neighbors < 1:
+        raise ValueError(f"neighbors must be at least 1: {neighbors}")
+    part_size = int(request_data.get('part_size', DEFAULT_PART_SIZE))
+    if part_size < MIN_PART_SIZE:
+        raise ValueError(f"part_size must be at least {MIN_PART_SIZE}: {part_size}")
+    return {
+        'algorithm': request_data.get('algorithm', '2opt'),
+        'neighbors': neighbors,
+        'deadline_ms': None if deadline_ms is None else float(deadline_ms),
+        'starts': int(request_data.get('starts', 1)),
+        'construction': request_data.get('construction', 'nearest_neighbor'),
+        'two_level': bool(request_data.get('two_level', False)),
+        'exact_max_cities': min(int(request_data.get('exact_max_cities', EXACT_MAX_CITIES)), EXACT_HARD_MAX_CITIES),
+        'lower_bound': bool(request_data.get('lower_bound', False)),
+        'target_gap': None if request_data.get('target_gap') is None else float(request_data['target_gap']),
+        'kicks': None if request_data.get('kicks') is None else int(request_data['kicks']),
+        'seed': None if request_data.get('seed') is None else int(request_data['seed']),
+        'cooling': request_data.get('cooling', 'geometric'),
+        'partition': request_data.get('partition'),
+        'part_size': part_size,
+        'candidates': request_data.get('candidates', 'nearest'),
+        'portfolio': portfolio_strategies(request_data.get('portfolio')),
+        'target_length': None if request_data.get('target_length') is None else float(request_data['target_length'])
     }
 
 # Rate limiting decorator
@@ -229,10 +472,18 @@ def process_request(data):
         request_data = json.loads(data.decode('utf-8'))
         cities = request_data['data']
         received_hash = request_data['hash']
+        # A batch request carries a list of instances in 'data'; only the deadline applies to it
+        batch = bool(request_data.get('batch', False))
+        options = request_options(request_data)
+        if batch:
+            options = {'deadline_ms': options['deadline_ms']}
+
+        # Results depend on the solver options as well as the cities
+        cache_key = (received_hash, batch, tuple(sorted(options.items())))
 
         # Check if the hash already exists in the processed_requests
-        if received_hash in processed_requests:
-            return processed_requests[received_hash]
+        if cache_key in processed_requests:
+            return processed_requests[cache_key]
 
         # Calculate the hash of the cities data
         calculated_hash = qprx.custom_hash(json.dumps(cities).encode('utf-8').decode('utf-8'))
@@ -242,8 +493,8 @@ def process_request(data):
             return {"error": "Hash verification failed"}
 
         # Process the data
-        result = solve_tsp(cities)
-        processed_requests[received_hash] = result
+        result = solve_tsp_batch(cities, **options) if batch else solve_tsp(cities, **options)
+        processed_requests[cache_key] = result
 
         # Check cache size and clear if necessary
         if len(processed_requests) > CACHE_SIZE_LIMIT:
@@ -254,40 +505,41 @@ def process_request(data):
         return {"error": str(e)}
 
 
-# Server setup
-tcp_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-tcp_socket.bind(('127.0.0.1', 3000))
-tcp_socket.listen(5)
-
-udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-udp_socket.bind(('127.0.0.1', 3000))
-
-print('Server is listening on 127.0.0.1:3000...')
-
-sockets_list = [tcp_socket, udp_socket]
-
-while True:
-    read_sockets, _, _ = select.select(sockets_list, [], [])
-
-    for notified_socket in read_sockets:
-        if notified_socket == tcp_socket:
-            connection, client_address = tcp_socket.accept()
-            try:
-                data = connection.recv(4096)
-                if data:
-                    result = process_request(data)
-                    response = json.dumps(result).encode('utf-8')
-                    connection.sendall(response)
-            except Exception as e:
-                print(f"TCP error: {e}")
-            finally:
-                connection.close()
-        elif notified_socket == udp_socket:
-            try:
-                data, address = udp_socket.recvfrom(4096)
-                if data:
-                    result = process_request(data)
-                    response = json.dumps(result).encode('utf-8')
-                    udp_socket.sendto(response, address)
-            except Exception as e:
-                print(f"UDP error: {e}")
\ No newline at end of file
+if __name__ == '__main__':
+    # Server setup (guarded so worker processes can import this module safely)
+    tcp_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    tcp_socket.bind(('127.0.0.1', 3000))
+    tcp_socket.listen(5)
+
+    udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    udp_socket.bind(('127.0.0.1', 3000))
+
+    print('Server is listening on 127.0.0.1:3000...')
+
+    sockets_list = [tcp_socket, udp_socket]
+
+    while True:
+        read_sockets, _, _ = select.select(sockets_list, [], [])
+
+        for notified_socket in read_sockets:
+            if notified_socket == tcp_socket:
+                connection, client_address = tcp_socket.accept()
+                try:
+                    data = connection.recv(4096)
+                    if data:
+                        result = process_request(data)
+                        response = json.dumps(result).encode('utf-8')
+                        connection.sendall(response)
+                except Exception as e:
+                    print(f"TCP error: {e}")
+                finally:
+                    connection.close()
+            elif notified_socket == udp_socket:
+                try:
+                    data, address = udp_socket.recvfrom(4096)
+                    if data:
+                        result = process_request(data)
+                        response = json.dumps(result).encode('utf-8')
+                        udp_socket.sendto(response, address)
+                except Exception as e:
+                    print(f"UDP error: {e}")
\ No newline at end of file
@@ -0,0 +1,54 @@
+from deadline import NO_DEADLINE
+from two_opt import two_opt_neighbors, two_opt_vectorized
+from local_search import iterated_local_search, local_search
+from annealing import simulated_annealing
+
+# Improvement algorithms a request can select with its 'algorithm' field;
+# 'none' returns the constructed tour as is
+ALGORITHMS = ('2opt', '2opt_best', '2opt_neighbors', 'or_opt', '2opt_or_opt', 'lk', 'ils', 'anneal', 'none')
+# Algorithms that work over candidate neighbour lists
+NEIGHBOR_ALGORITHMS = ('2opt_neighbors', 'or_opt', '2opt_or_opt', 'lk', 'ils', 'anneal')
+# Move types each local_search algorithm combines
+LOCAL_SEARCH_MOVES = {
+    'or_opt': ('or_opt',),
+    '2opt_or_opt': ('2opt', 'or_opt'),
+    'lk': ('lk', 'or_opt'),
+    'ils': ('2opt', 'or_opt')
+}
+DEFAULT_NEIGHBORS = 8  # Candidate list size for the neighbour-restricted engines
+
+def improve_tour(geometry, tour, algorithm='2opt', neighbors=DEFAULT_NEIGHBORS, deadline=NO_DEADLINE, neighbor_table=None,
+                 two_level=False, kicks=None, seed=0, cooling='geometric', candidates='nearest'):
+    """
+    Run the selected local search on the tour in place.
+
+    :param neighbor_table: Precomputed (n, k) neighbour table, saves workers from rebuilding it.
+    :param two_level: Let the neighbour-list engines move cities on a two-level list tour.
+    :param kicks: Double-bridge kicks 'ils' tries after its first local optimum; None means one per city.
+    :param seed: Seed of the 'ils' kick positions and the 'anneal' move draws.
+    :param cooling: Temperature schedule of 'anneal', one of COOLING_SCHEDULES.
+    :param candidates: Kind of neighbour table built when none is given, one of CANDIDATE_SETS.
+    :return: True if the search converged, False if the deadline stopped it.
+    """
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"Unknown algorithm: {algorithm}")
+    if algorithm == 'none':
+        return True
+    if algorithm in NEIGHBOR_ALGORITHMS and neighbor_table is None:
+        neighbor_table = geometry.candidate_neighbors(neighbors, candidates)
+    if algorithm == '2opt_neighbors':
+        # 2-opt over each city's nearest neighbours with don't-look bits
+        return two_opt_neighbors(tour, geometry.distance, neighbor_table.tolist(), deadline, two_level)
+    if algorithm == 'ils':
+        # 2-opt + Or-opt, then double-bridge kicks re-optimized around the kicked edges until the budget runs out
+        return iterated_local_search(tour, geometry.distance, neighbor_table.tolist(), LOCAL_SEARCH_MOVES[algorithm],
+                                     kicks, deadline, two_level, seed)
+    if algorithm == 'anneal':
+        # Simulated annealing over randomly drawn 2-opt and Or-opt moves, each scored in O(1)
+        return simulated_annealing(tour, geometry.distance, neighbor_table.tolist(), deadline, seed, cooling)
+    if algorithm in LOCAL_SEARCH_MOVES:
+        # Or-opt segment moves, alone or sharing one work queue with 2-opt or LK chains
+        return local_search(tour, geometry.distance, neighbor_table.tolist(), LOCAL_SEARCH_MOVES[algorithm], deadline,
+                            two_level)
+    # Full pairwise 2-opt sweep, each row of moves scored with NumPy; '2opt_best' takes the best move of a row
+    return two_opt_vectorized(tour, geometry.coords, deadline, best_improvement=algorithm == '2opt_best')
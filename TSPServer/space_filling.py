@@ -0,0 +1,66 @@
+import numpy as np
+
+# Bits per axis; two interleaved axes fill a 64-bit key
+CURVE_BITS = 32
+CURVES = ('morton', 'hilbert')
+
+def quantize(coords, bits=CURVE_BITS):
+    """Map coordinates onto a 2^bits integer grid with one scale for both axes, as uint64 arrays."""
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    top = (1 << bits) - 1
+    if len(coords) == 0:
+        return np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.uint64)
+    low = coords.min(axis=0)
+    span = float((coords.max(axis=0) - low).max())
+    scale = top / span if span > 0 else 0.0
+    grid = np.clip(np.floor((coords - low) * scale), 0, top).astype(np.uint64)
+    return grid[:, 0], grid[:, 1]
+
+def spread_bits(v):
+    """Spread the low 32 bits of each value so they occupy the even bits of a 64-bit word."""
+    v = v & np.uint64(0x00000000FFFFFFFF)
+    v = (v | (v << np.uint64(16))) & np.uint64(0x0000FFFF0000FFFF)
+    v = (v | (v << np.uint64(8))) & np.uint64(0x00FF00FF00FF00FF)
+    v = (v | (v << np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    v = (v | (v << np.uint64(2))) & np.uint64(0x3333333333333333)
+    v = (v | (v << np.uint64(1))) & np.uint64(0x5555555555555555)
+    return v
+
+def morton_keys(coords):
+    """64-bit Morton (Z-order) key of every city, 32 bits per axis."""
+    x, y = quantize(coords)
+    return spread_bits(x) | (spread_bits(y) << np.uint64(1))
+
+def hilbert_keys(coords, bits=CURVE_BITS):
+    """64-bit Hilbert curve index of every city, computed for the whole array at once."""
+    x, y = quantize(coords, bits)
+    top = np.uint64((1 << bits) - 1)
+    keys = np.zeros(len(x), dtype=np.uint64)
+    for level in range(bits - 1, -1, -1):
+        s = np.uint64(1 << level)
+        rx = (x & s) != 0
+        ry = (y & s) != 0
+        keys += s * s * ((np.uint64(3) * rx.astype(np.uint64)) ^ ry.astype(np.uint64))
+
+        # Rotate the quadrant so the lower levels follow the curve orientation
+        flip = ~ry & rx
+        x = np.where(flip, top - x, x)
+        y = np.where(flip, top - y, y)
+        x, y = np.where(ry, x, y), np.where(ry, y, x)
+    return keys
+
+def curve_keys(coords, curve='morton'):
+    if curve == 'morton':
+        return morton_keys(coords)
+    if curve == 'hilbert':
+        return hilbert_keys(coords)
+    raise ValueError(f"Unknown curve: {curve}")
+
+def curve_order(coords, curve='morton'):
+    """Indices that sort the cities along the space-filling curve."""
+    return np.argsort(curve_keys(coords, curve), kind='stable')
+
+def curve_sort(cities, curve='morton'):
+    """Return the city dicts sorted along the space-filling curve."""
+    coords = np.array([(city['x'], city['y']) for city in cities], dtype=np.float64).reshape(-1, 2)
+    return [cities[idx] for idx in curve_order(coords, curve).tolist()]
@@ -0,0 +1,235 @@
+import heapq
+import numpy as np
+
+class KDTree:
+    """
+    Static k-d tree over city coordinates answering nearest-city queries while cities are removed or added.
+
+    Every node keeps a count of the cities still present below it, so emptied
+    subtrees are skipped and queries stay close to O(log n) as the tree drains
+    (or, built empty, as it fills).
+    """
+
+    def __init__(self, coords, leaf_size=8, empty=False):
+        coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        self.xs = coords[:, 0].tolist()
+        self.ys = coords[:, 1].tolist()
+        self.leaf_size = leaf_size
+        self.present = [True] * len(self.xs)
+
+        # Flat node arrays: bounding box, children (-1 for leaves), leaf members and live counts
+        self.bounds = []
+        self.children = []
+        self.members = []
+        self.counts = []
+        self.parent = []
+        self.leaf_of = [0] * len(self.xs)
+        if len(self.xs):
+            self._build(coords, np.arange(len(self.xs)), -1)
+
+        # An empty tree starts with every city absent and is filled with add()
+        if empty:
+            self.present = [False] * len(self.xs)
+            self.counts = [0] * len(self.counts)
+
+    def _build(self, coords, indices, parent):
+        node = len(self.bounds)
+        points = coords[indices]
+        low, high = points.min(axis=0), points.max(axis=0)
+        self.bounds.append((float(low[0]), float(low[1]), float(high[0]), float(high[1])))
+        self.children.append((-1, -1))
+        self.members.append(None)
+        self.counts.append(len(indices))
+        self.parent.append(parent)
+
+        if len(indices) <= self.leaf_size:
+            self.members[node] = indices.tolist()
+            for idx in self.members[node]:
+                self.leaf_of[idx] = node
+            return node
+
+        # Split on the wider axis at the median
+        axis = 0 if high[0] - low[0] >= high[1] - low[1] else 1
+        middle = len(indices) // 2
+        split = np.argpartition(points[:, axis], middle)
+        left = self._build(coords, indices[split[:middle]], node)
+        right = self._build(coords, indices[split[middle:]], node)
+        self.children[node] = (left, right)
+        return node
+
+    def remove(self, idx):
+        """Remove a city so later queries no longer return it."""
+        if not self.present[idx]:
+            return
+        self.present[idx] = False
+        node = self.leaf_of[idx]
+        while node != -1:
+            self.counts[node] -= 1
+            node = self.parent[node]
+
+    def add(self, idx):
+        """Put a city (back) into the tree."""
+        if self.present[idx]:
+            return
+        self.present[idx] = True
+        node = self.leaf_of[idx]
+        while node != -1:
+            self.counts[node] += 1
+            node = self.parent[node]
+
+    def _box_distance(self, node, x, y):
+        min_x, min_y, max_x, max_y = self.bounds[node]
+        dx = min_x - x if x < min_x else (x - max_x if x > max_x else 0.0)
+        dy = min_y - y if y < min_y else (y - max_y if y > max_y else 0.0)
+        return dx * dx + dy * dy
+
+    def nearest(self, x, y):
+        """Index of the remaining city closest to (x, y), or -1 when the tree is empty."""
+        if not self.counts or self.counts[0] == 0:
+            return -1
+        xs, ys, present = self.xs, self.ys, self.present
+        best, best_distance = -1, float('inf')
+        stack = [(0.0, 0)]
+
+        while stack:
+            box_distance, node = stack.pop()
+            if box_distance >= best_distance or self.counts[node] == 0:
+                continue
+            members = self.members[node]
+            if members is not None:
+                for idx in members:
+                    if present[idx]:
+                        dx = xs[idx] - x
+                        dy = ys[idx] - y
+                        distance = dx * dx + dy * dy
+                        if distance < best_distance:
+                            best, best_distance = idx, distance
+                continue
+
+            # Visit the closer child first by pushing it last
+            left, right = self.children[node]
+            left_distance = self._box_distance(left, x, y)
+            right_distance = self._box_distance(right, x, y)
+            if left_distance <= right_distance:
+                stack.append((right_distance, right))
+                stack.append((left_distance, left))
+            else:
+                stack.append((left_distance, left))
+                stack.append((right_distance, right))
+
+        return best
+
+    def nearest_to(self, idx):
+        """Index of the remaining city closest to city idx."""
+        return self.nearest(self.xs[idx], self.ys[idx])
+
+    def nearest_k(self, x, y, k, box=None):
+        """
+        Indices of the (up to) k remaining cities closest to (x, y), closest first.
+
+        :param box: Optional (min_x, min_y, max_x, max_y) limiting the search to
+                    cities with min_x <= x < max_x and min_y <= y < max_y.
+        """
+        if k <= 0 or not self.counts or self.counts[0] == 0:
+            return []
+        if box is not None:
+            return self._nearest_k_in_box(x, y, k, box)
+        xs, ys, present = self.xs, self.ys, self.present
+        # Max-heap of the best k found so far as (-squared distance, index)
+        found = []
+        bound = float('inf')
+        stack = [(0.0, 0)]
+
+        while stack:
+            box_distance, node = stack.pop()
+            if box_distance >= bound or self.counts[node] == 0:
+                continue
+            members = self.members[node]
+            if members is not None:
+                for idx in members:
+                    if present[idx]:
+                        dx = xs[idx] - x
+                        dy = ys[idx] - y
+                        distance = dx * dx + dy * dy
+                        if len(found) < k:
+                            heapq.heappush(found, (-distance, idx))
+                        elif distance < bound:
+                            heapq.heapreplace(found, (-distance, idx))
+                        if len(found) == k:
+                            bound = -found[0][0]
+                continue
+
+            left, right = self.children[node]
+            left_distance = self._box_distance(left, x, y)
+            right_distance = self._box_distance(right, x, y)
+            if left_distance <= right_distance:
+                stack.append((right_distance, right))
+                stack.append((left_distance, left))
+            else:
+                stack.append((left_distance, left))
+                stack.append((right_distance, right))
+
+        return [idx for _, idx in sorted(found, reverse=True)]
+
+    def _nearest_k_in_box(self, x, y, k, box):
+        xs, ys, present, bounds = self.xs, self.ys, self.present, self.bounds
+        low_x, low_y, high_x, high_y = box
+        found = []
+        bound = float('inf')
+        stack = [(0.0, 0)]
+
+        while stack:
+            box_distance, node = stack.pop()
+            if box_distance >= bound or self.counts[node] == 0:
+                continue
+            min_x, min_y, max_x, max_y = bounds[node]
+            if max_x < low_x or min_x >= high_x or max_y < low_y or min_y >= high_y:
+                continue
+            members = self.members[node]
+            if members is not None:
+                for idx in members:
+                    px, py = xs[idx], ys[idx]
+                    if present[idx] and low_x <= px < high_x and low_y <= py < high_y:
+                        dx = px - x
+                        dy = py - y
+                        distance = dx * dx + dy * dy
+                        if len(found) < k:
+                            heapq.heappush(found, (-distance, idx))
+                        elif distance < bound:
+                            heapq.heapreplace(found, (-distance, idx))
+                        if len(found) == k:
+                            bound = -found[0][0]
+                continue
+
+            left, right = self.children[node]
+            left_distance = self._box_distance(left, x, y)
+            right_distance = self._box_distance(right, x, y)
+            if left_distance <= right_distance:
+                stack.append((right_distance, right))
+                stack.append((left_distance, left))
+            else:
+                stack.append((left_distance, left))
+                stack.append((right_distance, right))
+
+        return [idx for _, idx in sorted(found, reverse=True)]
+
+class LazyNeighbors:
+    """
+    Per-city nearest-neighbour lists answered from a KDTree on first access and kept.
+
+    Indexes like the list of lists the local searches take, for searches that
+    only ever look at a small part of a large instance.
+    """
+
+    def __init__(self, tree, k):
+        self.tree = tree
+        self.k = k
+        self.lists = {}
+
+    def __getitem__(self, city):
+        found = self.lists.get(city)
+        if found is None:
+            tree = self.tree
+            nearest = tree.nearest_k(tree.xs[city], tree.ys[city], self.k + 1)
+            found = self.lists[city] = [idx for idx in nearest if idx != city][:self.k]
+        return found
@@ -0,0 +1,113 @@
+from array import array
+import numpy as np
+
+# Typecode for tours: C int, 4 bytes per city
+TOUR_TYPECODE = 'i'
+
+# Reversals at least this long run as NumPy slice operations instead of a Python swap loop
+VECTOR_REVERSAL = 48
+
+def make_tour(cities=()):
+    """Compact int32 tour holding city indices in visiting order, without the closing city."""
+    return array(TOUR_TYPECODE, cities)
+
+def tour_from_indices(indices):
+    """Array tour from a NumPy index vector, e.g. an argsort result."""
+    tour = make_tour()
+    tour.frombytes(np.ascontiguousarray(indices, dtype=np.int32).tobytes())
+    return tour
+
+def tour_view(tour):
+    """Zero-copy NumPy int32 view of an array tour for vectorized kernels."""
+    if isinstance(tour, array):
+        return np.frombuffer(tour, dtype=np.int32)
+    return np.asarray(tour, dtype=np.int32)
+
+def rotate_tour(tour, start_city):
+    """Return the tour rotated so that it begins at start_city."""
+    pos = tour.index(start_city)
+    return tour[pos:] + tour[:pos]
+
+def is_valid_tour(tour, num_cities):
+    """Check that the tour visits every city index exactly once."""
+    return len(tour) == num_cities and set(tour) == set(range(num_cities))
+
+def encode_path(tour, names):
+    """City names in tour order, closed by returning to the first city."""
+    path = [names[idx] for idx in tour]
+    if path:
+        path.append(path[0])
+    return path
+
+def encode_array(tour, cities):
+    """Name and coordinates of each city in tour order, closed by returning to the first city."""
+    path_array = [{'name': cities[idx]['name'], 'x': cities[idx]['x'], 'y': cities[idx]['y']} for idx in tour]
+    if path_array:
+        path_array.append(dict(path_array[0]))
+    return path_array
+
+class ArrayTour:
+    """
+    Cyclic array tour with a city -> position index, for local-search engines.
+
+    Moves are expressed as 2-opt exchanges of edges, independent of which way
+    the cycle is read, so a reversal may flip the shorter side of the tour and
+    swap the reading direction of everything else.
+    """
+
+    def __init__(self, tour):
+        self.tour = tour
+        self.num_cities = len(tour)
+        # The tour keeps its buffer view for vectorized reversals, so it cannot be resized meanwhile
+        self.view = tour_view(tour)
+        self.position = make_tour(bytes(4 * self.num_cities))
+        self.position_view = tour_view(self.position)
+        self.position_view[self.view] = np.arange(self.num_cities, dtype=np.int32)
+
+    def cities(self):
+        """Cities in tour order."""
+        return list(self.tour)
+
+    def next(self, city):
+        return self.tour[(self.position[city] + 1) % self.num_cities]
+
+    def prev(self, city):
+        return self.tour[(self.position[city] - 1) % self.num_cities]
+
+    def between(self, a, b, c):
+        """True if b lies on the path from a forward to c (inclusive)."""
+        pos_a, pos_b, pos_c = self.position[a], self.position[b], self.position[c]
+        if pos_a <= pos_c:
+            return pos_a <= pos_b <= pos_c
+        return pos_b >= pos_a or pos_b <= pos_c
+
+    def reverse(self, a, b):
+        """Reverse the path from a forward to b, flipping the shorter side of the cycle."""
+        tour, position, num_cities = self.tour, self.position, self.num_cities
+        start, end = position[a], position[b]
+        length = (end - start) % num_cities + 1
+        if length * 2 > num_cities:
+            start, end = (end + 1) % num_cities, (start - 1) % num_cities
+            length = num_cities - length
+        if length >= VECTOR_REVERSAL:
+            if start <= end:
+                slots = np.arange(start, end + 1)
+            else:
+                slots = np.concatenate((np.arange(start, num_cities), np.arange(end + 1)))
+            cities = self.view[slots[::-1]]
+            self.view[slots] = cities
+            self.position_view[cities] = slots
+            return
+        for _ in range(length // 2):
+            city_a, city_b = tour[start], tour[end]
+            tour[start], tour[end] = city_b, city_a
+            position[city_b], position[city_a] = start, end
+            start = (start + 1) % num_cities
+            end = (end - 1) % num_cities
+
+    def two_opt_move(self, a, b, c, d):
+        """Replace edges (a, b) and (c, d) with (a, c) and (b, d); b and d follow a and c in the same direction."""
+        if self.next(a) == b:
+            self.reverse(b, c)
+        else:
+            self.reverse(a, d)
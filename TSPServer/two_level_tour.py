@@ -0,0 +1,164 @@
+import math
+from tour import make_tour
+
+class TwoLevelTour:
+    """
+    Cyclic tour stored as a ring of segments of about sqrt(n) cities, each with a reversed bit.
+
+    Offers the same next/prev/between/reverse/two_opt_move interface as
+    ArrayTour. A reversal splits at most two segments at its ends and then
+    reverses the order of the whole segments in between, toggling their bits,
+    so it costs O(sqrt(n)) instead of the O(n) of a flat array. Splits add
+    segments; once there are twice as many as planned the ring is rebuilt,
+    which amortises to O(sqrt(n)) per reversal as well.
+    """
+
+    def __init__(self, tour):
+        self.num_cities = len(tour)
+        self.group_size = max(8, int(math.sqrt(self.num_cities)))
+        self.segment_of = [0] * self.num_cities
+        self.index_of = [0] * self.num_cities
+        self._build(list(tour))
+
+    def _build(self, cities):
+        group = self.group_size
+        # Per-segment city lists, reversed bits and rank in the ring; order lists segments by rank
+        self.members = [cities[start:start + group] for start in range(0, len(cities), group)]
+        self.reversed = [False] * len(self.members)
+        self.rank = list(range(len(self.members)))
+        self.order = list(range(len(self.members)))
+        for segment, members in enumerate(self.members):
+            self._index(segment, 0, len(members))
+
+    def _index(self, segment, start, end):
+        segment_of, index_of, members = self.segment_of, self.index_of, self.members[segment]
+        for idx in range(start, end):
+            city = members[idx]
+            segment_of[city] = segment
+            index_of[city] = idx
+
+    def cities(self):
+        """Cities in tour order."""
+        sequence = []
+        for segment in self.order:
+            sequence.extend(self.members[segment][::-1] if self.reversed[segment] else self.members[segment])
+        return sequence
+
+    def store(self, tour):
+        """Write the current tour order back into an array tour."""
+        tour[:] = make_tour(self.cities())
+
+    def _first(self, segment):
+        return self.members[segment][-1] if self.reversed[segment] else self.members[segment][0]
+
+    def _last(self, segment):
+        return self.members[segment][0] if self.reversed[segment] else self.members[segment][-1]
+
+    def next(self, city):
+        segment = self.segment_of[city]
+        members, idx = self.members[segment], self.index_of[city]
+        if self.reversed[segment]:
+            if idx > 0:
+                return members[idx - 1]
+        elif idx + 1 < len(members):
+            return members[idx + 1]
+        return self._first(self.order[(self.rank[segment] + 1) % len(self.order)])
+
+    def prev(self, city):
+        segment = self.segment_of[city]
+        members, idx = self.members[segment], self.index_of[city]
+        if self.reversed[segment]:
+            if idx + 1 < len(members):
+                return members[idx + 1]
+        elif idx > 0:
+            return members[idx - 1]
+        return self._last(self.order[(self.rank[segment] - 1) % len(self.order)])
+
+    def _key(self, city):
+        # (segment rank, offset inside the segment in tour direction) orders cities along the tour
+        segment = self.segment_of[city]
+        idx = self.index_of[city]
+        if self.reversed[segment]:
+            idx = len(self.members[segment]) - 1 - idx
+        return self.rank[segment], idx
+
+    def between(self, a, b, c):
+        """True if b lies on the path from a forward to c (inclusive)."""
+        key_a, key_b, key_c = self._key(a), self._key(b), self._key(c)
+        if key_a <= key_c:
+            return key_a <= key_b <= key_c
+        return key_b >= key_a or key_b <= key_c
+
+    def _split(self, city):
+        """Split city's segment so that city starts a segment in tour direction."""
+        segment = self.segment_of[city]
+        members = self.members[segment]
+        idx = self.index_of[city]
+        reversed_segment = self.reversed[segment]
+
+        # The cities past city in the list move to a new segment, so the
+        # ones left keep their list indices: with a reversed segment that is
+        # the part before city in tour direction, placed ahead of this one
+        if reversed_segment:
+            if idx == len(members) - 1:
+                return
+            moved = members[idx + 1:]
+            position = self.rank[segment]
+        else:
+            if idx == 0:
+                return
+            moved = members[idx:]
+            position = self.rank[segment] + 1
+        del members[len(members) - len(moved):]
+
+        new_segment = len(self.members)
+        self.members.append(moved)
+        self.reversed.append(reversed_segment)
+        self._index(new_segment, 0, len(moved))
+        self.order.insert(position, new_segment)
+        self.rank.append(position)
+        for rank in range(position + 1, len(self.order)):
+            self.rank[self.order[rank]] = rank
+
+    def reverse(self, a, b):
+        """Reverse the path from a forward to b."""
+        segment = self.segment_of[a]
+        if segment == self.segment_of[b] and self._key(a) <= self._key(b):
+            # The path stays inside one segment: reverse that stretch of its city list
+            start, end = sorted((self.index_of[a], self.index_of[b]))
+            members = self.members[segment]
+            members[start:end + 1] = members[start:end + 1][::-1]
+            self._index(segment, start, end + 1)
+            return
+
+        after = self.next(b)
+        if after == a:
+            # The path is the whole cycle; reversing it leaves every edge in place
+            return
+        self._split(a)
+        self._split(after)
+
+        # Reverse the run of whole segments from a's to b's, or the complementary run
+        order, rank = self.order, self.rank
+        num_segments = len(order)
+        first, last = rank[self.segment_of[a]], rank[self.segment_of[b]]
+        length = (last - first) % num_segments + 1
+        if length * 2 > num_segments:
+            first, last = rank[self.segment_of[after]], rank[self.segment_of[self.prev(a)]]
+            length = num_segments - length
+        slots = [(first + step) % num_segments for step in range(length)]
+        segments = [order[slot] for slot in slots]
+        for slot, segment in zip(slots, reversed(segments)):
+            order[slot] = segment
+            rank[segment] = slot
+            self.reversed[segment] = not self.reversed[segment]
+
+        if num_segments > 2 * (self.num_cities // self.group_size + 1):
+            self._build(self.cities())
+
+    def two_opt_move(self, a, b, c, d):
+        """Replace edges (a, b) and (c, d) with (a, c) and (b, d); b and d follow a and c in the same direction."""
+        if self.next(a) == b:
+            self.reverse(b, c)
+        else:
+            self.reverse(a, d)
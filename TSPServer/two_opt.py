@@ -0,0 +1,177 @@
+from collections import deque
+import numpy as np
+from deadline import NO_DEADLINE
+from tour import ArrayTour, tour_view
+from two_level_tour import TwoLevelTour
+
+# Smallest gain worth applying, keeps float noise from looping forever
+IMPROVEMENT_EPSILON = 1e-10
+
+def two_opt(tour, distance, deadline=NO_DEADLINE):
+    """
+    Improve a tour in place with the full pairwise 2-opt sweep.
+
+    The first city stays in place; every pass tries all segment reversals
+    and the sweep repeats until a pass finds no improving move. The deadline
+    is checked between rows of the sweep.
+
+    :return: True if the tour reached a 2-opt local optimum, False if the deadline cut it short.
+    """
+    num_cities = len(tour)
+    improved = True
+
+    while improved:
+        improved = False
+        for i in range(1, num_cities - 1):
+            if deadline.expired():
+                return False
+            for j in range(i + 1, num_cities):
+                if distance(tour[i - 1], tour[i]) + distance(tour[j], tour[(j + 1) % num_cities]) > \
+                   distance(tour[i - 1], tour[j]) + distance(tour[i], tour[(j + 1) % num_cities]) + IMPROVEMENT_EPSILON:
+                    tour[i:j + 1] = tour[i:j + 1][::-1]
+                    improved = True
+
+    return True
+
+def two_opt_vectorized(tour, coords, deadline=NO_DEADLINE, best_improvement=False, restart=False):
+    """
+    Full pairwise 2-opt sweep that scores every j of a row in one NumPy expression.
+
+    For a fixed i the gains of all reversals tour[i..j] come from the tour's
+    point and edge-length arrays at once, so the interpreter runs per row
+    rather than per candidate move. First improvement scans the row exactly
+    like two_opt (same moves, same result); best_improvement applies the best
+    move of the row and rescans it until none improves.
+
+    :param tour: Array tour of city indices, without the closing city; reversed in place.
+    :param coords: (n, 2) coordinate array indexed by city.
+    :param restart: Start the next pass as soon as a row has improved, instead of finishing the sweep.
+    :return: True if the tour reached a 2-opt local optimum, False if the deadline cut it short.
+    """
+    num_cities = len(tour)
+    if num_cities < 4:
+        return True
+    view = tour_view(tour)
+    # Points in tour order and edge[k] = length of the edge from position k to k + 1
+    points = np.asarray(coords, dtype=np.float64)[view]
+    deltas = points - np.roll(points, -1, axis=0)
+    edge = np.hypot(deltas[:, 0], deltas[:, 1])
+
+    def reverse(i, j):
+        view[i:j + 1] = view[i:j + 1][::-1]
+        points[i:j + 1] = points[i:j + 1][::-1]
+        edge[i:j] = edge[i:j][::-1]
+        for k in (i - 1, j):
+            dx, dy = points[k] - points[(k + 1) % num_cities]
+            edge[k] = np.hypot(dx, dy)
+
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, num_cities - 1):
+            if deadline.expired():
+                return False
+            row_improved = False
+            start = i + 1
+            while start < num_cities:
+                # Candidates j = start..n-1: c = tour[j], d = tour[j + 1] (wrapping to tour[0])
+                c = points[start:]
+                d = np.concatenate((points[start + 1:], points[:1]))
+                to_a = c - points[i - 1]
+                to_b = d - points[i]
+                removed = edge[i - 1] + edge[start:]
+                added = np.hypot(to_a[:, 0], to_a[:, 1]) + np.hypot(to_b[:, 0], to_b[:, 1])
+                if best_improvement:
+                    gains = removed - added
+                    k = int(gains.argmax())
+                    if not gains[k] > IMPROVEMENT_EPSILON:
+                        break
+                    reverse(i, start + k)
+                else:
+                    better = removed > added + IMPROVEMENT_EPSILON
+                    k = int(better.argmax())
+                    if not better[k]:
+                        break
+                    reverse(i, start + k)
+                    start += k + 1
+                row_improved = True
+            if row_improved:
+                improved = True
+                if restart:
+                    break
+
+    return True
+
+def two_opt_neighbors(tour, distance, neighbors, deadline=NO_DEADLINE, two_level=False):
+    """
+    Improve a cyclic tour in place with 2-opt restricted to candidate neighbour lists.
+
+    Only moves that add an edge between a city and one of its neighbours are
+    tried, and don't-look bits keep cities whose surroundings have not changed
+    out of the work queue, so a pass costs about O(n * k) instead of O(n^2).
+
+    :param tour: Tour array of city indices in visiting order, without the closing city.
+    :param distance: Callable returning the distance between two city indices.
+    :param neighbors: Per-city candidate lists sorted by increasing distance.
+    :param deadline: Deadline polled before each city is examined.
+    :param two_level: Apply the moves on a TwoLevelTour instead of an ArrayTour.
+    :return: True if the tour reached a local optimum, False if the deadline cut it short.
+    """
+    num_cities = len(tour)
+    if num_cities < 4:
+        return True
+    if not two_level:
+        return _two_opt_neighbors(ArrayTour(tour), distance, neighbors, deadline)
+
+    linked = TwoLevelTour(tour)
+    deadline.watch(linked)
+    converged = _two_opt_neighbors(linked, distance, neighbors, deadline)
+    linked.store(tour)
+    return converged
+
+def try_two_opt(tour, distance, neighbors, city_a):
+    """
+    Apply the first improving 2-opt move that adds an edge from city_a to one of its neighbours.
+
+    Shared by two_opt_neighbors and the combined local search.
+
+    :return: Cities whose tour edges changed, or None if no move improves the tour.
+    """
+    for step in (tour.next, tour.prev):
+        city_b = step(city_a)
+        removed_ab = distance(city_a, city_b)
+        for city_c in neighbors[city_a]:
+            added_ac = distance(city_a, city_c)
+            # Neighbours are sorted, so no later candidate can pay for the new edge
+            if added_ac >= removed_ab:
+                break
+            city_d = step(city_c)
+            if city_d == city_a or city_c == city_b:
+                continue
+            gain = removed_ab + distance(city_c, city_d) - added_ac - distance(city_b, city_d)
+            if gain > IMPROVEMENT_EPSILON:
+                tour.two_opt_move(city_a, city_b, city_c, city_d)
+                return (city_a, city_b, city_c, city_d)
+    return None
+
+def _two_opt_neighbors(tour, distance, neighbors, deadline):
+    # Every city starts active; a city is requeued when one of its tour edges changes
+    queue = deque(tour.cities())
+    active = [True] * tour.num_cities
+
+    while queue:
+        if deadline.expired():
+            return False
+        city_a = queue.popleft()
+        active[city_a] = False
+
+        # Improve around city_a until no move helps; the other ends of every move are queued again
+        touched = try_two_opt(tour, distance, neighbors, city_a)
+        while touched is not None:
+            for city in touched[1:]:
+                if not active[city]:
+                    active[city] = True
+                    queue.append(city)
+            touched = try_two_opt(tour, distance, neighbors, city_a)
+
+    return True
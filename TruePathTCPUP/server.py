@@ -1,10 +1,19 @@
-import math
+import os
+import sys
 import socket
 import select
 import json
 from ratelimit import limits, sleep_and_retry
 import time
 
+# Shared solver modules live in the TSPServer folder
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'TSPServer'))
+from geometry import CityGeometry
+from space_filling import curve_sort
+from distance_cache import DistanceCache
+from construction import nearest_neighbor_tour
+from two_opt import IMPROVEMENT_EPSILON, two_opt_neighbors
+
 class QPRx2025:
     def __init__(self, seed=0):
         self.seed = seed % 1000000
@@ -114,122 +123,96 @@ processed_requests = {}
 REQUEST_LIMIT = 500
 TIME_PERIOD = 60 # 60 seconds
 CACHE_SIZE_LIMIT = 2000  # Define cache size limit
+DISTANCE_CACHE_BYTES = 64 * 1024 * 1024  # Memory budget for cached distance tables
+MATRIX_ENTRY_BYTES = 2  # float32 condensed triangle: 4 bytes per pair, each pair stored once
+MATRIX_FREE_NEIGHBORS = 10  # Candidate list size of the matrix-free 2-opt
 
+# Distance matrices keyed by coordinates, shared by repeated requests
+distance_cache = DistanceCache(max_bytes=DISTANCE_CACHE_BYTES)
 
-# Memoized dictionary to store distances for efficiency
-memoized_distances = {}
-
-# Higher-order function to memoize distances
-def memoize_distance(func):
-    def wrapper(city1, city2):
-        key = frozenset((city1['name'], city2['name']))
-        if key not in memoized_distances:
-            memoized_distances[key] = func(city1, city2)
-        return memoized_distances[key]
-    return wrapper
-
-@memoize_distance
-def calculate_distance(city1, city2):
-    return math.hypot(city1['x'] - city2['x'], city1['y'] - city2['y'])
-
-# Function to calculate total distance of the path
-def total_distance(path):
-    return sum(calculate_distance(path[i], path[(i + 1) % len(path)]) for i in range(len(path)))
-
-# Morton order function
-def morton_order(city):
-    def interleave_bits(x, y):
-        def spread_bits(v):
-            return (v | (v << 8)) & 0x00FF00FF | ((v | (v << 4)) & 0x0F0F0F0F) | ((v | (v << 2)) & 0x33333333) | ((v | (v << 1)) & 0x55555555)
-        return spread_bits(x) | (spread_bits(y) << 1)
-    x = int(city['x'] * 10000)  # Scale to avoid float precision issues
-    y = int(city['y'] * 10000)
-    return interleave_bits(x, y)
 
 def solve_tsp(cities):
-    # Precompute and store distances between all pairs of cities in a matrix
-    num_cities = len(cities)
-    distance_matrix = [[0] * num_cities for _ in range(num_cities)]
-    for i in range(num_cities):
-        for j in range(num_cities):
-            if i != j:
-                distance_matrix[i][j] = calculate_distance(cities[i], cities[j])
-
-    # Sort cities based on Morton order
-    cities_sorted = sorted(cities, key=morton_order)
-    city_indices = {city['name']: idx for idx, city in enumerate(cities_sorted)}
+    # Sort cities based on Morton order; the path holds indices into cities_sorted
+    cities_sorted = curve_sort(cities, 'morton')
+    geometry = CityGeometry(cities_sorted, cache=distance_cache)
+    num_cities = geometry.num_cities
+
+    # Without room for the matrix, distances come on demand from the coordinate
+    # arrays and only a k-nearest-neighbour table is precomputed (O(n * k) memory)
+    if not geometry.matrix_fits(MATRIX_ENTRY_BYTES):
+        return solve_matrix_free(geometry, cities_sorted)
+
+    # Precompute the distances between all pairs of cities as a condensed float32 upper triangle
+    matrix = geometry.condensed_matrix()
+    distance = matrix.distance
 
     # Measure time for the optimization process
     start_time = time.time()
 
-    # Initialize the path with the first city and mark it as visited
-    path = [cities_sorted[0]]
-    visited = set()
-    visited.add(cities_sorted[0]['name'])
-    current_city = cities_sorted[0]
-    current_index = city_indices[current_city['name']]
-
     # Build the path by selecting the nearest unvisited city
-    while len(visited) < num_cities:
-        closest_city = None
-        closest_dist = float('inf')
-        for city in cities_sorted:
-            if city['name'] not in visited:
-                city_index = city_indices[city['name']]
-                dist = distance_matrix[current_index][city_index]
-                if dist < closest_dist:
-                    closest_dist = dist
-                    closest_city = city
-                    closest_city_index = city_index
-
-        if closest_city is None:
-            break
-
-        path.append(closest_city)
-        visited.add(closest_city['name'])
-        current_city = closest_city
-        current_index = closest_city_index
+    path = nearest_neighbor_tour(geometry)
 
     # Ensure path returns to start to form a complete tour
     path.append(path[0])
 
     # 2-opt optimization to improve the path
-    def calculate_total_distance(path):
-        return sum(distance_matrix[city_indices[path[i]['name']]][city_indices[path[(i + 1) % num_cities]['name']]] for i in range(num_cities))
-
-    def two_opt_swap(path, i, k):
-        new_path = path[:i] + path[i:k+1][::-1] + path[k+1:]
-        return new_path
-
-    best_distance = calculate_total_distance(path)
     improved = True
 
     while improved:
         improved = False
         for i in range(1, num_cities - 1):
+            # Reversing path[i..k] only replaces edges (a, b) = (i-1, i) and (c, d) = (k, k+1); path[num_cities]
+            # closes the tour. The rows of a and b come out of the triangle once as lists for the whole scan of k.
+            a = path[i - 1]
+            row_a = matrix.row(a).tolist()
+            b = path[i]
+            row_b = matrix.row(b).tolist()
             for k in range(i + 1, num_cities):
-                new_path = two_opt_swap(path, i, k)
-                new_distance = calculate_total_distance(new_path)
-                if new_distance < best_distance:
-                    path = new_path
-                    best_distance = new_distance
+                c, d = path[k], path[k + 1]
+                delta = row_a[c] + row_b[d] - row_a[b] - distance(c, d)
+                if delta < -IMPROVEMENT_EPSILON:
+                    path[i:k + 1] = path[i:k + 1][::-1]
                     improved = True
+                    b = path[i]
+                    row_b = matrix.row(b).tolist()
 
-    total_dist = best_distance
+    # Report the true float64 length of the final path rather than the sum of float32 deltas
+    total_dist = geometry.tour_length(path[:num_cities])
     end_time = time.time()
     total_time = round((end_time - start_time) * 1000, 2)  # Convert to milliseconds and round to 2 decimal places
 
     # Construct optimized array with coordinates
-    optimized_array = [{'name': city['name'], 'x': city['x'], 'y': city['y']} for city in path]
+    optimized_array = [{'name': cities_sorted[idx]['name'], 'x': cities_sorted[idx]['x'], 'y': cities_sorted[idx]['y']}
+                       for idx in path]
 
     result = {
-        'optimized_path': [city['name'] for city in path],
+        'optimized_path': [geometry.names[idx] for idx in path],
         'optimized_distance': total_dist,
         'optimization_time': total_time,
-        'optimized_array': optimized_array
+        'optimized_array': optimized_array,
+        'matrix_free': False
     }
     return result
 
+def solve_matrix_free(geometry, cities_sorted):
+    """Nearest-neighbour tour and 2-opt over each city's nearest neighbours, without a distance matrix."""
+    start_time = time.time()
+    neighbor_table = geometry.nearest_neighbors(MATRIX_FREE_NEIGHBORS).tolist()
+    path = nearest_neighbor_tour(geometry)
+    two_opt_neighbors(path, geometry.distance, neighbor_table)
+    total_dist = geometry.tour_length(path)
+    path.append(path[0])
+    total_time = round((time.time() - start_time) * 1000, 2)
+
+    return {
+        'optimized_path': [geometry.names[idx] for idx in path],
+        'optimized_distance': total_dist,
+        'optimization_time': total_time,
+        'optimized_array': [{'name': cities_sorted[idx]['name'], 'x': cities_sorted[idx]['x'], 'y': cities_sorted[idx]['y']}
+                            for idx in path],
+        'matrix_free': True
+    }
+
 # Rate limiting decorator
 @sleep_and_retry
 @limits(calls=REQUEST_LIMIT, period=TIME_PERIOD)
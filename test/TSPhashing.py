@@ -145,10 +145,6 @@ def morton_order(city):
 def solve_tsp(cities):
     """Optimize the path using the swap opt neighbor method."""
 
-    # Precompute and store distances between all pairs of cities
-    distances = {frozenset((city1['name'], city2['name'])): calculate_distance(city1, city2)
-                 for city1 in cities for city2 in cities if city1 != city2}
-
     # Sort cities based on Morton order
     cities_sorted = sorted(cities, key=morton_order)
 
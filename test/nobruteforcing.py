@@ -1,24 +1,20 @@
+import os
+import sys
 import math
 import time
+from array import array
 
-# Memoized dictionary to store distances for efficiency
-memoized_distances = {}
+# Shared solver modules live in the TSPServer folder
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'TSPServer'))
+from geometry import CityGeometry
+from construction import nearest_neighbor_tour
+from tour import rotate_tour
+from two_opt import two_opt_neighbors
 
-# Higher-order function to memoize distances
-def memoize_distance(func):
-    def wrapper(city1, city2):
-        key = frozenset((city1['name'], city2['name']))
-        if key not in memoized_distances:
-            memoized_distances[key] = func(city1, city2)
-        return memoized_distances[key]
-    return wrapper
-
-@memoize_distance
-def calculate_distance(city1, city2):
-    return math.hypot(city1['x'] - city2['x'], city1['y'] - city2['y'])
-
-def total_distance(path):
-    return sum(calculate_distance(path[i], path[(i + 1) % len(path)]) for i in range(len(path)))
+# Largest distance matrix worth precomputing; bigger inputs run matrix-free
+MATRIX_MEMORY_BYTES = 256 * 1024 * 1024
+MATRIX_ENTRY_BYTES = 2  # float32 condensed triangle: 4 bytes per pair, each pair stored once
+MATRIX_FREE_NEIGHBORS = 10  # Candidate list size of the matrix-free 2-opt
 
 def morton_order(city):
     def interleave_bits(x, y):
@@ -29,6 +25,38 @@ def morton_order(city):
     y = int(city['y'] * 10000)
     return interleave_bits(x, y)
 
+def solve_matrix_free(cities_sorted):
+    """
+    Nearest-neighbour tour and neighbour-list 2-opt with distances computed on demand.
+
+    Only the k-nearest-neighbour lists are stored, O(n * k) memory instead of the n x n matrix.
+    """
+    geometry = CityGeometry(cities_sorted)
+    neighbors = geometry.nearest_neighbors(MATRIX_FREE_NEIGHBORS).tolist()
+
+    # Measure time for the optimization process
+    start_time = time.time()
+
+    # Nearest-neighbour steps query a k-d tree of the unvisited cities, so there is no scan over all of them
+    tour = nearest_neighbor_tour(geometry)
+    two_opt_neighbors(tour, geometry.distance, neighbors)
+
+    # Start from the first city again and return to it
+    tour = rotate_tour(list(tour), 0)
+    total_dist = geometry.tour_length(tour)
+    path = [cities_sorted[city] for city in tour]
+    path.append(path[0])
+    end_time = time.time()
+    total_time = round((end_time - start_time) * 1000, 2)  # Convert to milliseconds and round to 2 decimal places
+
+    return {
+        'optimized_path': [city['name'] for city in path],
+        'optimized_distance': total_dist,
+        'optimization_time': total_time,
+        'optimized_array': [{'name': city['name'], 'x': city['x'], 'y': city['y']} for city in path],
+        'matrix_free': True
+    }
+
 def solve_tsp(cities):
     """
     Solve the Traveling Salesperson Problem (TSP) using the 2-opt optimization method.
@@ -36,17 +64,30 @@ def solve_tsp(cities):
     :param cities: List of city dictionaries to be visited.
     :return: Dictionary containing the optimized path, distance, time, and coordinates.
     """
-    # Precompute and store distances between all pairs of cities in a matrix
-    num_cities = len(cities)
-    distance_matrix = [[0] * num_cities for _ in range(num_cities)]
-    for i in range(num_cities):
-        for j in range(num_cities):
-            if i != j:
-                distance_matrix[i][j] = calculate_distance(cities[i], cities[j])
-
     # Sort cities based on Morton order
     cities_sorted = sorted(cities, key=morton_order)
     city_indices = {city['name']: idx for idx, city in enumerate(cities_sorted)}
+    num_cities = len(cities)
+
+    # Without room for the matrix, run matrix-free on k-nearest-neighbour lists
+    if num_cities * num_cities * MATRIX_ENTRY_BYTES > MATRIX_MEMORY_BYTES:
+        return solve_matrix_free(cities_sorted)
+
+    # Precompute the distances between all pairs of cities, indexed like city_indices, as the condensed
+    # upper triangle in float32: pair (i, j), i < j, sits at row_start[i] + j
+    row_start = [i * (2 * num_cities - i - 3) // 2 - 1 for i in range(num_cities)]
+    condensed = array('f', bytes(4 * (num_cities * (num_cities - 1) // 2)))
+    for i in range(num_cities):
+        for j in range(i + 1, num_cities):
+            condensed[row_start[i] + j] = math.hypot(cities_sorted[i]['x'] - cities_sorted[j]['x'],
+                                                     cities_sorted[i]['y'] - cities_sorted[j]['y'])
+
+    def distance(i, j):
+        if i < j:
+            return condensed[row_start[i] + j]
+        if i > j:
+            return condensed[row_start[j] + i]
+        return 0.0
 
     # Measure time for the optimization process
     start_time = time.time()
@@ -65,7 +106,7 @@ def solve_tsp(cities):
         for city in cities_sorted:
             if city['name'] not in visited:
                 city_index = city_indices[city['name']]
-                dist = distance_matrix[current_index][city_index]
+                dist = distance(current_index, city_index)
                 if dist < closest_dist:
                     closest_dist = dist
                     closest_city = city
@@ -83,28 +124,25 @@ def solve_tsp(cities):
     path.append(path[0])
 
     # 2-opt optimization to improve the path
-    def calculate_total_distance(path):
-        return sum(distance_matrix[city_indices[path[i]['name']]][city_indices[path[(i + 1) % num_cities]['name']]] for i in range(num_cities))
-
-    def two_opt_swap(path, i, k):
-        new_path = path[:i] + path[i:k+1][::-1] + path[k+1:]
-        return new_path
+    def two_opt_delta(path, i, k):
+        # Reversing path[i..k] only replaces edges (i-1, i) and (k, k+1); path[num_cities] closes the tour
+        a, b, c, d = (city_indices[path[idx]['name']] for idx in (i - 1, i, k, k + 1))
+        return distance(a, c) + distance(b, d) - distance(a, b) - distance(c, d)
 
-    best_distance = calculate_total_distance(path)
     improved = True
 
     while improved:
         improved = False
         for i in range(1, num_cities - 1):
             for k in range(i + 1, num_cities):
-                new_path = two_opt_swap(path, i, k)
-                new_distance = calculate_total_distance(new_path)
-                if new_distance < best_distance:
-                    path = new_path
-                    best_distance = new_distance
+                delta = two_opt_delta(path, i, k)
+                if delta < -1e-10:
+                    path[i:k + 1] = path[i:k + 1][::-1]
                     improved = True
 
-    total_dist = best_distance
+    # Report the true length of the final path from the coordinates rather than the float32 matrix
+    total_dist = sum(math.hypot(path[i]['x'] - path[i + 1]['x'], path[i]['y'] - path[i + 1]['y'])
+                     for i in range(num_cities))
     end_time = time.time()
     total_time = round((end_time - start_time) * 1000, 2)  # Convert to milliseconds and round to 2 decimal places
 
@@ -115,7 +153,8 @@ def solve_tsp(cities):
         'optimized_path': [city['name'] for city in path],
         'optimized_distance': total_dist,
         'optimization_time': total_time,
-        'optimized_array': optimized_array
+        'optimized_array': optimized_array,
+        'matrix_free': False
     }
     return result
 